@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+OHLCV_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class BarSeries:
+    """Array-backed bar series with float32 columns and int64 epoch timestamps.
+
+    Values are stored as a single ``(n_columns, n_rows)`` float32 matrix so each
+    column is a contiguous view and any set of columns can be gathered with one
+    fancy-indexing operation. Timestamps are nanoseconds since the epoch (UTC).
+    Volume is also kept as a float64 side array, since float32 is not exact
+    above 2**24; reading ``'Volume'`` returns that array.
+    """
+
+    __slots__ = ('timestamps', 'values', 'volume', 'columns', 'column_index', 'tz', 'attrs')
+
+    def __init__(self, timestamps: np.ndarray, values: np.ndarray,
+                 columns: Sequence[str], tz: Optional[str] = None, volume: Optional[np.ndarray] = None):
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+        if values.ndim != 2 or values.shape[0] != len(columns):
+            raise ValueError(f"values shape {values.shape} does not match {len(columns)} columns")
+        if values.shape[1] != len(timestamps):
+            raise ValueError(f"{len(timestamps)} timestamps for {values.shape[1]} rows")
+
+        self.timestamps = timestamps
+        self.values = values
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.column_index: Dict[str, int] = {name: i for i, name in enumerate(self.columns)}
+        self.tz = tz
+        self.attrs: Dict = {}
+
+        if volume is None and 'Volume' in self.column_index:
+            volume = values[self.column_index['Volume']]
+        if volume is not None:
+            volume = np.ascontiguousarray(volume, dtype=np.float64)
+            if len(volume) != len(timestamps):
+                raise ValueError(f"{len(volume)} volumes for {len(timestamps)} rows")
+        self.volume = volume
+
+    # Construye la serie a partir de un DataFrame de pandas (borde de entrada)
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> 'BarSeries':
+        """Build a series from a DatetimeIndex-ed DataFrame"""
+        columns = tuple(columns) if columns is not None else tuple(df.columns)
+        values = np.full((len(columns), len(df)), np.nan, dtype=np.float32)
+        for i, name in enumerate(columns):
+            if name in df.columns:
+                values[i] = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        volume = None
+        if 'Volume' in columns and 'Volume' in df.columns:
+            volume = df['Volume'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        index = pd.DatetimeIndex(df.index)
+        tz = str(index.tz) if index.tz is not None else None
+        if tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return cls(index.asi8, values, columns, tz=tz, volume=volume)
+
+    # Convierte la serie a DataFrame de pandas (borde de salida)
+    def to_dataframe(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Convert back to a pandas DataFrame"""
+        columns = tuple(columns) if columns is not None else self.columns
+        rows = self.values[[self.column_index[name] for name in columns]]
+        df = pd.DataFrame(rows.T, index=self.index(), columns=list(columns))
+        if 'Volume' in df.columns:
+            df['Volume'] = self.volume
+        return df
+
+    def index(self) -> pd.DatetimeIndex:
+        """Timestamps as a pandas DatetimeIndex in the original timezone"""
+        index = pd.DatetimeIndex(self.timestamps.view('datetime64[ns]'))
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index
+
+    def timestamp(self, row: int = -1) -> pd.Timestamp:
+        """Timestamp of a single row in the original timezone"""
+        ts = pd.Timestamp(int(self.timestamps[row]), unit='ns')
+        if self.tz is not None:
+            ts = ts.tz_localize('UTC').tz_convert(self.tz)
+        return ts
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.column_index
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name == 'Volume' and self.volume is not None:
+            return self.volume
+        return self.values[self.column_index[name]]
+
+    def latest(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        """Latest value of a column, or ``default`` when it is NaN"""
+        value = self[name][-1]
+        if np.isnan(value):
+            return default
+        return float(value)
+
+    def tail(self, n: int) -> 'BarSeries':
+        """Series holding only the last ``n`` rows"""
+        series = BarSeries(self.timestamps[-n:], self.values[:, -n:], self.columns, tz=self.tz,
+                           volume=self._volume_rows(slice(-n, None)))
+        series.attrs = dict(self.attrs)
+        return series
+
+    def take(self, rows: np.ndarray) -> 'BarSeries':
+        """Series holding only the given row positions"""
+        return BarSeries(self.timestamps[rows], self.values[:, rows], self.columns, tz=self.tz,
+                         volume=self._volume_rows(rows))
+
+    def _volume_rows(self, rows) -> Optional[np.ndarray]:
+        return self.volume[rows] if self.volume is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        volume = self.volume.nbytes if self.volume is not None else 0
+        return self.values.nbytes + self.timestamps.nbytes + volume
+
+
+# Borde JSON: los float32 se devuelven con el decimal más corto que los representa
+def json_floats(values: np.ndarray) -> List[float]:
+    """Values as plain floats without float32 noise (5012.38, not 5012.3798828125)"""
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64).tolist()
+
+
+def json_float(value: Optional[float]) -> Optional[float]:
+    """Scalar version of ``json_floats``; None stays None"""
+    return None if value is None else float(str(np.float32(value)))
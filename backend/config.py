@@ -9,9 +9,20 @@ AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_DEFAULT_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'sp500-models')
 S3_MODEL_KEY = os.getenv('S3_MODEL_KEY', 'xgboost_sp500_model.pkl')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None  # p. ej. MinIO local
+S3_DOWNLOAD_CONCURRENCY = int(os.getenv('S3_DOWNLOAD_CONCURRENCY', 8))
+S3_PART_SIZE = int(os.getenv('S3_PART_SIZE', 8 * 1024 * 1024))  # 8 MB
+S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 16 * 1024 * 1024))  # 16 MB
 
 # Polygon.io API
 POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
+POLYGON_BASE_URL = os.getenv('POLYGON_BASE_URL', 'https://api.polygon.io')
+NEWS_TICKER = os.getenv('NEWS_TICKER', 'SPY')
+NEWS_REFRESH_INTERVAL = int(os.getenv('NEWS_REFRESH_INTERVAL', 300))  # 5 minutes
+NEWS_RETRY_INTERVAL = int(os.getenv('NEWS_RETRY_INTERVAL', 30))  # tras un refresco fallido
+NEWS_LOOKBACK_DAYS = int(os.getenv('NEWS_LOOKBACK_DAYS', 7))
+NEWS_PAGE_LIMIT = int(os.getenv('NEWS_PAGE_LIMIT', 100))
+NEWS_MAX_PAGES = int(os.getenv('NEWS_MAX_PAGES', 20))  # páginas por refresco (next_url)
 
 # Server Configuration
 PORT = int(os.getenv('PORT', 8000))
@@ -20,4 +31,37 @@ DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
 
 # Model Configuration
 MODEL_CACHE_DURATION = int(os.getenv('MODEL_CACHE_DURATION', 3600))  # 1 hour
-MARKET_DATA_CACHE_DURATION = int(os.getenv('MARKET_DATA_CACHE_DURATION', 300))  # 5 minutes
+MARKET_DATA_CACHE_DURATION = int(os.getenv('MARKET_DATA_CACHE_DURATION', 300))  # 5 minutes, en sesión
+MARKET_CLOSE_GRACE = int(os.getenv('MARKET_CLOSE_GRACE', 600))  # refresco tras el cierre hasta fijar la vela
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 256))  # predicciones + SHAP por (versión, vela)
+
+# Upstream resilience (segundos)
+UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', 4.0))
+UPSTREAM_FAILURE_THRESHOLD = int(os.getenv('UPSTREAM_FAILURE_THRESHOLD', 3))
+UPSTREAM_RESET_TIMEOUT = float(os.getenv('UPSTREAM_RESET_TIMEOUT', 30.0))
+
+# Latency budgets per endpoint (segundos)
+MARKET_DEADLINE = float(os.getenv('MARKET_DEADLINE', 3.0))
+HISTORICAL_DEADLINE = float(os.getenv('HISTORICAL_DEADLINE', 5.0))
+PREDICTION_DEADLINE = float(os.getenv('PREDICTION_DEADLINE', 6.0))
+INTRADAY_DEADLINE = float(os.getenv('INTRADAY_DEADLINE', 3.0))
+
+# CPU worker pools (kind: process o thread) con cola de admisión acotada
+INDICATOR_POOL_KIND = os.getenv('INDICATOR_POOL_KIND', 'process')
+INDICATOR_POOL_WORKERS = int(os.getenv('INDICATOR_POOL_WORKERS', 2))
+INDICATOR_POOL_QUEUE = int(os.getenv('INDICATOR_POOL_QUEUE', 8))
+PREDICT_POOL_KIND = os.getenv('PREDICT_POOL_KIND', 'thread')
+PREDICT_POOL_WORKERS = int(os.getenv('PREDICT_POOL_WORKERS', 2))
+PREDICT_POOL_QUEUE = int(os.getenv('PREDICT_POOL_QUEUE', 16))
+POOL_RETRY_AFTER = int(os.getenv('POOL_RETRY_AFTER', 2))  # segundos
+
+# Prediction history store
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', 'prediction_history.db')
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 100))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 1.0))  # segundos
+
+# Intraday Configuration
+INTRADAY_INTERVAL = os.getenv('INTRADAY_INTERVAL', '1m')  # 1m o 5m
+INTRADAY_BUFFER_SIZE = int(os.getenv('INTRADAY_BUFFER_SIZE', 2048))  # barras por ticker
+INTRADAY_TICKERS = tuple(t.strip() for t in os.getenv('INTRADAY_TICKERS', '^GSPC').split(',') if t.strip())  # únicos tickers con buffer
+INTRADAY_TARGET_BARS_PER_SECOND = int(os.getenv('INTRADAY_TARGET_BARS_PER_SECOND', 20000))
@@ -0,0 +1,79 @@
+import numpy as np
+from typing import Optional
+
+from bar_series import BarSeries, OHLCV_COLUMNS
+
+# Resoluciones soportadas -> frecuencia de periodo de pandas
+RESOLUTIONS = {'daily': None, 'weekly': 'W', 'monthly': 'M'}
+
+
+def resample_ohlc(series: BarSeries, resolution: str) -> BarSeries:
+    """Aggregate bars into weekly or monthly OHLCV bars.
+
+    Buckets are contiguous runs of equal calendar period (in the series'
+    timezone), so every aggregate is one ``reduceat`` over the bucket starts.
+    Each output bar is stamped with its first input bar.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    freq = RESOLUTIONS[resolution]
+    if freq is None or len(series) == 0:
+        return series
+
+    periods = series.index().tz_localize(None).to_period(freq).asi8
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(periods)) + 1))
+    ends = np.concatenate((starts[1:], [len(series)])) - 1
+
+    volume = np.add.reduceat(series['Volume'], starts)
+    values = np.stack([
+        series['Open'][starts],
+        np.maximum.reduceat(series['High'], starts),
+        np.minimum.reduceat(series['Low'], starts),
+        series['Close'][ends],
+        volume,
+    ])
+    return BarSeries(series.timestamps[starts], values, OHLCV_COLUMNS, tz=series.tz, volume=volume)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Row indices chosen by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, for each of ``threshold - 2`` equal
+    buckets, the point forming the largest triangle with the previously kept
+    point and the mean of the next bucket. The triangle areas of a whole bucket
+    are computed as one array operation.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(series: BarSeries, points: Optional[int] = None) -> BarSeries:
+    """At most ``points`` bars chosen by LTTB over close prices"""
+    if points is not None and points < len(series):
+        rows = lttb_indices(series.timestamps, series['Close'], points)
+        series = series.take(rows)
+    return series
+
+
+def chart_series(series: BarSeries, resolution: str = 'daily', points: Optional[int] = None) -> BarSeries:
+    """Chart-ready bars: optional OHLC resampling, then LTTB over close prices"""
+    return downsample(resample_ohlc(series, resolution), points)
@@ -0,0 +1,103 @@
+import numpy as np
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+from bar_series import BarSeries
+
+
+class Feature(NamedTuple):
+    name: str    # Nombre de la columna en el modelo entrenado
+    column: str  # Columna de origen en la BarSeries de indicadores
+    factor: str  # Grupo de factores al que se atribuye su contribución
+
+
+class CompiledSchema:
+    """Feature schema resolved against one column layout.
+
+    ``column_index`` holds the row of each feature in ``BarSeries.values`` so
+    any set of bars can be turned into a model matrix with one gather.
+    """
+
+    def __init__(self, names: Tuple[str, ...], columns: Tuple[str, ...], column_index: np.ndarray):
+        self.names = names
+        self.columns = columns
+        self.column_index = column_index
+
+    def gather(self, series: BarSeries, rows: Union[int, slice, np.ndarray] = -1) -> np.ndarray:
+        """Return a ``(n_rows, n_features)`` float32 matrix for the given rows"""
+        if isinstance(rows, (int, np.integer)):
+            matrix = series.values[self.column_index, rows][np.newaxis, :]
+        elif isinstance(rows, slice):
+            matrix = series.values[self.column_index, rows].T
+        else:
+            matrix = series.values[np.ix_(self.column_index, rows)].T
+        # NaN (indicadores sin calentar) se sustituye por 0
+        return np.nan_to_num(matrix, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class FeatureSchema:
+    """Declarative list of model features, compiled once per column layout"""
+
+    def __init__(self, features: Sequence[Feature]):
+        self.features = tuple(features)
+        self.names = tuple(f.name for f in self.features)
+        self.source_columns = tuple(dict.fromkeys(f.column for f in self.features))
+        self.factors = tuple(dict.fromkeys(f.factor for f in self.features))
+        self.factor_index = np.array([self.factors.index(f.factor) for f in self.features], dtype=np.intp)
+        self._compiled: Dict[Tuple[str, ...], CompiledSchema] = {}
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def compile(self, columns: Sequence[str]) -> CompiledSchema:
+        """Resolve feature columns to row indices of a BarSeries layout"""
+        columns = tuple(columns)
+        compiled = self._compiled.get(columns)
+        if compiled is None:
+            missing = [f.column for f in self.features if f.column not in columns]
+            if missing:
+                raise ValueError(f"Feature columns not available: {missing}")
+            index = np.array([columns.index(f.column) for f in self.features], dtype=np.intp)
+            compiled = CompiledSchema(self.names, columns, index)
+            self._compiled[columns] = compiled
+        return compiled
+
+    def group_contributions(self, contributions: np.ndarray) -> np.ndarray:
+        """Sum per-feature contributions ``(n_rows, n_features)`` into ``(n_rows, n_factors)``"""
+        grouped = np.zeros((contributions.shape[0], len(self.factors)), dtype=np.float64)
+        np.add.at(grouped.T, self.factor_index, contributions.T)
+        return grouped
+
+    def validate(self, model_feature_names: Optional[Sequence[str]], num_features: Optional[int] = None):
+        """Raise ValueError if the model's feature layout does not match the schema"""
+        if model_feature_names is not None:
+            model_feature_names = tuple(model_feature_names)
+            if model_feature_names != self.names:
+                raise ValueError(
+                    f"Model feature names {list(model_feature_names)} do not match schema {list(self.names)}"
+                )
+        elif num_features is not None and num_features != len(self):
+            raise ValueError(f"Model expects {num_features} features, schema defines {len(self)}")
+
+
+# Orden de entrenamiento del modelo XGBoost: columnas "1".."19" y su grupo de factores
+FEATURE_SCHEMA = FeatureSchema([
+    Feature('1', 'bb_lower', 'volatility'),
+    Feature('2', 'bb_upper', 'volatility'),
+    Feature('3', 'rsi', 'momentum'),
+    Feature('4', 'adx', 'trend'),
+    Feature('5', 'Volume', 'volume'),
+    Feature('6', 'ret_5d', 'momentum'),
+    Feature('7', 'Close', 'trend'),
+    Feature('8', 'sma_10', 'trend'),
+    Feature('9', 'sma_200', 'trend'),
+    Feature('10', 'bb_middle', 'volatility'),
+    Feature('11', 'vol_20', 'volatility'),
+    Feature('12', 'ret_1d', 'momentum'),
+    Feature('13', 'sma_100', 'trend'),
+    Feature('14', 'macd', 'momentum'),
+    Feature('15', 'obv', 'volume'),
+    Feature('16', 'macd_signal', 'momentum'),
+    Feature('17', 'sma_50', 'trend'),
+    Feature('18', 'bb_width', 'volatility'),
+    Feature('19', 'sma_20', 'trend'),
+])
@@ -0,0 +1,166 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import HISTORY_BATCH_SIZE, HISTORY_DB_PATH, HISTORY_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    bar_ts INTEGER NOT NULL,        -- epoch seconds (UTC) of the bar the features come from
+    created_at REAL NOT NULL,       -- epoch seconds when the prediction was published
+    model_version TEXT NOT NULL,
+    prediction REAL NOT NULL,
+    confidence REAL NOT NULL,
+    target_price REAL,
+    direction TEXT,
+    features BLOB                   -- float32 little-endian, FEATURE_SCHEMA order
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_bar_ts ON predictions (bar_ts, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_model_bar_ts ON predictions (model_version, bar_ts, id);
+"""
+
+_INSERT = """
+INSERT INTO predictions
+    (bar_ts, created_at, model_version, prediction, confidence, target_price, direction, features)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class PredictionHistoryStore:
+    """Append-only SQLite log of published predictions.
+
+    ``record`` only enqueues the row; a background thread writes queued rows
+    in batches (one transaction per batch), so the request path never waits
+    on disk. Range queries go through the ``bar_ts`` indexes.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH, batch_size: int = HISTORY_BATCH_SIZE,
+                 flush_interval: float = HISTORY_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue()
+        self.writer: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.last_recorded: Dict[str, tuple] = {}
+        self.rows_written = 0
+        self.initialized = False
+
+    # La base de datos se crea en el primer uso, no al importar el módulo
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self.initialized:
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            self.initialized = True
+        return conn
+
+    def _ensure_writer(self):
+        with self.lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self._write_loop, name="prediction-history", daemon=True)
+                self.writer.start()
+
+    # Encola una predicción publicada (no bloquea la petición)
+    def record(self, bar_ts: int, model_version: str, prediction: float, confidence: float,
+               features: Sequence[float], target_price: Optional[float] = None,
+               direction: Optional[str] = None):
+        """Queue one published prediction for the background writer"""
+        # Las respuestas servidas desde caché repiten la misma predicción
+        key = (bar_ts, prediction, confidence)
+        if self.last_recorded.get(model_version) == key:
+            return
+        self.last_recorded[model_version] = key
+
+        blob = np.asarray(features, dtype='<f4').tobytes()
+        self.queue.put((bar_ts, time.time(), model_version, float(prediction), float(confidence),
+                        target_price, direction, blob))
+        self._ensure_writer()
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, batch)
+                    self.rows_written += len(batch)
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing prediction history batch: {str(e)}")
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued rows and stop the writer thread"""
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join(timeout)
+
+    # Consulta por rango de timestamp de barra usando el índice
+    def query(self, start: Optional[int] = None, end: Optional[int] = None,
+              model_version: Optional[str] = None, limit: int = 500) -> List[Dict]:
+        """Return predictions with ``start <= bar_ts <= end`` in bar order"""
+        clauses, params = [], []
+        if model_version is not None:
+            clauses.append("model_version = ?")
+            params.append(model_version)
+        if start is not None:
+            clauses.append("bar_ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("bar_ts <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT bar_ts, created_at, model_version, prediction, confidence, target_price, direction, features "
+               f"FROM predictions {where} ORDER BY bar_ts, id LIMIT ?")
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                'barTimestamp': bar_ts,
+                'createdAt': created_at,
+                'modelVersion': version,
+                'prediction': prediction,
+                'confidence': confidence,
+                'targetPrice': target_price,
+                'direction': direction,
+                'features': np.frombuffer(blob, dtype='<f4').tolist() if blob else []
+            }
+            for bar_ts, created_at, version, prediction, confidence, target_price, direction, blob in rows
+        ]
+
+# Global prediction history store instance
+history_store = PredictionHistoryStore()
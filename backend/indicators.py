@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import ta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from bar_series import BarSeries, OHLCV_COLUMNS
+
+
+class Indicator(NamedTuple):
+    deps: Tuple[str, ...]                 # Columnas (OHLCV u otros indicadores) que necesita
+    compute: Callable[[Dict[str, pd.Series]], pd.Series]
+
+
+def _sma(window: int) -> Indicator:
+    return Indicator(('Close',), lambda c: c['Close'].rolling(window=window, min_periods=window).mean())
+
+
+def _bollinger_band(sign: float) -> Indicator:
+    def compute(c):
+        std = c['Close'].rolling(window=20, min_periods=20).std(ddof=0)
+        return c['bb_middle'] + sign * 2 * std
+    return Indicator(('Close', 'bb_middle'), compute)
+
+
+def _macd(c):
+    close = c['Close']
+    fast = close.ewm(span=12, min_periods=12, adjust=False).mean()
+    slow = close.ewm(span=26, min_periods=26, adjust=False).mean()
+    return fast - slow
+
+
+# Registro de indicadores: cada columna declara sus dependencias (el orden define SERIES_COLUMNS)
+INDICATORS: Dict[str, Indicator] = {
+    'rsi': Indicator(('Close',), lambda c: ta.momentum.RSIIndicator(c['Close'], window=14).rsi()),
+    'macd': Indicator(('Close',), _macd),
+    'macd_signal': Indicator(('macd',), lambda c: c['macd'].ewm(span=9, min_periods=9, adjust=False).mean()),
+    'macd_histogram': Indicator(('macd', 'macd_signal'), lambda c: c['macd'] - c['macd_signal']),
+    'sma_10': _sma(10),
+    'sma_20': _sma(20),
+    'sma_50': _sma(50),
+    'sma_100': _sma(100),
+    'sma_200': _sma(200),
+    'bb_upper': _bollinger_band(1.0),
+    'bb_middle': Indicator(('sma_20',), lambda c: c['sma_20']),
+    'bb_lower': _bollinger_band(-1.0),
+    'bb_width': Indicator(('bb_upper', 'bb_lower', 'bb_middle'),
+                          lambda c: (c['bb_upper'] - c['bb_lower']) / c['bb_middle'] * 100),
+    'adx': Indicator(('High', 'Low', 'Close'),
+                     lambda c: ta.trend.ADXIndicator(c['High'], c['Low'], c['Close']).adx()),
+    'obv': Indicator(('Close', 'Volume'),
+                     lambda c: ta.volume.OnBalanceVolumeIndicator(c['Close'], c['Volume']).on_balance_volume()),
+    'ret_1d': Indicator(('Close',), lambda c: c['Close'].pct_change(1)),
+    'ret_5d': Indicator(('Close',), lambda c: c['Close'].pct_change(5)),
+    'vol_20': Indicator(('ret_1d',), lambda c: c['ret_1d'].rolling(window=20).std()),
+}
+
+INDICATOR_COLUMNS = tuple(INDICATORS)
+SERIES_COLUMNS = OHLCV_COLUMNS + INDICATOR_COLUMNS
+
+
+def resolve(names: Iterable[str], available: Iterable[str] = OHLCV_COLUMNS) -> List[str]:
+    """Indicators to compute for ``names``, dependencies first, skipping ``available``"""
+    done = set(available)
+    order: List[str] = []
+
+    def visit(name: str):
+        if name in done:
+            return
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator: {name}")
+        for dep in INDICATORS[name].deps:
+            visit(dep)
+        done.add(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+# Etapa de CPU: calcula columnas a partir de arrays (se ejecuta en el pool de workers)
+def compute_indicators(inputs: Dict[str, np.ndarray], names: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Compute ``names`` and their dependencies from the given input columns.
+
+    Returns every column computed along the way so the caller can cache the
+    dependencies too.
+    """
+    columns = {name: pd.Series(values, dtype=np.float64) for name, values in inputs.items()}
+    computed = {}
+    for name in resolve(names, columns):
+        columns[name] = INDICATORS[name].compute(columns)
+        computed[name] = columns[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    return computed
+
+
+class IndicatorFrame(BarSeries):
+    """BarSeries whose indicator columns are computed on first use.
+
+    Values are preallocated for every column in ``SERIES_COLUMNS``; a column is
+    filled (together with its dependencies) the first time it is read or
+    ``require``-d, and reused afterwards.
+    """
+
+    __slots__ = ('computed',)
+
+    def __init__(self, timestamps: np.ndarray, values: np.ndarray, tz: Optional[str] = None,
+                 volume: Optional[np.ndarray] = None):
+        super().__init__(timestamps, values, SERIES_COLUMNS, tz=tz, volume=volume)
+        self.computed = np.zeros(len(SERIES_COLUMNS), dtype=bool)
+        self.computed[:len(OHLCV_COLUMNS)] = True
+
+    @classmethod
+    def from_ohlcv(cls, df: pd.DataFrame) -> 'IndicatorFrame':
+        """Frame with OHLCV from ``df`` and no indicator computed yet"""
+        raw = BarSeries.from_dataframe(df, SERIES_COLUMNS)
+        return cls(raw.timestamps, raw.values, tz=raw.tz, volume=raw.volume)
+
+    def computed_columns(self) -> Tuple[str, ...]:
+        return tuple(name for name, done in zip(self.columns, self.computed) if done)
+
+    def missing(self, names: Iterable[str]) -> List[str]:
+        """Indicators (including dependencies) not computed yet for ``names``"""
+        return resolve(names, self.computed_columns())
+
+    def inputs_for(self, names: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Already-computed columns that ``names`` depend on"""
+        needed = {dep for name in names for dep in INDICATORS[name].deps if dep not in names}
+        return {dep: self[dep] for dep in needed}
+
+    def store(self, columns: Dict[str, np.ndarray]):
+        for name, values in columns.items():
+            index = self.column_index[name]
+            self.values[index] = values
+            self.computed[index] = True
+
+    def require(self, *names: str) -> 'IndicatorFrame':
+        """Compute any missing ``names`` (and dependencies) in the calling thread"""
+        missing = self.missing(names)
+        if missing:
+            self.store(compute_indicators(self.inputs_for(missing), missing))
+        return self
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if not self.computed[self.column_index[name]]:
+            self.require(name)
+        return super().__getitem__(name)
+
+    def latest(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        if not self.computed[self.column_index[name]]:
+            self.require(name)
+        return super().latest(name, default)
+
+    def to_dataframe(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        columns = tuple(columns) if columns is not None else self.columns
+        self.require(*[name for name in columns if name in INDICATORS])
+        return super().to_dataframe(columns)
+
+    # Los recortes solo llevan columnas ya calculadas: un indicador calculado
+    # sobre un tramo parcial no coincidiría con el de la serie completa
+    def tail(self, n: int) -> BarSeries:
+        series = BarSeries(self.timestamps[-n:], self.values[self.computed, -n:],
+                           self.computed_columns(), tz=self.tz, volume=self._volume_rows(slice(-n, None)))
+        series.attrs = dict(self.attrs)
+        return series
+
+    def take(self, rows: np.ndarray) -> BarSeries:
+        return BarSeries(self.timestamps[rows], self.values[self.computed][:, rows],
+                         self.computed_columns(), tz=self.tz, volume=self._volume_rows(rows))
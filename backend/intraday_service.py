@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import csv
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from bar_series import BarSeries
+from config import (INTRADAY_BUFFER_SIZE, INTRADAY_INTERVAL, INTRADAY_TARGET_BARS_PER_SECOND, INTRADAY_TICKERS,
+                    UPSTREAM_FAILURE_THRESHOLD, UPSTREAM_RESET_TIMEOUT, UPSTREAM_TIMEOUT)
+from indicators import SERIES_COLUMNS
+from resilience import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Segundos por barra para cada intervalo soportado
+INTERVAL_SECONDS = {'1m': 60, '5m': 300}
+
+# Una barra: (timestamp en ns, open, high, low, close, volume)
+Bar = Tuple[int, float, float, float, float, float]
+
+class _RollingWindow:
+    """Running sum and sum of squares over the last ``window`` pushed values"""
+
+    __slots__ = ('window', 'values', 'pos', 'count', 'total', 'total_sq')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = [0.0] * window
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value: float):
+        old = self.values[self.pos]
+        if self.count == self.window:
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.values[self.pos] = value
+        self.pos = (self.pos + 1) % self.window
+        self.total += value
+        self.total_sq += value * value
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.window
+
+    def mean(self) -> float:
+        return self.total / self.count if self.full else math.nan
+
+    def std(self, ddof: int = 0) -> float:
+        if not self.full:
+            return math.nan
+        n = self.count
+        var = (self.total_sq - self.total * self.total / n) / (n - ddof)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class IntradayBuffer:
+    """Fixed-capacity ring buffer of minute bars with streaming indicators.
+
+    Each ingested bar updates the indicator state in O(1) and writes one column
+    of the ring, so memory stays constant no matter how long the process runs.
+    Indicator columns match ``SERIES_COLUMNS`` so snapshots can be used
+    wherever a daily ``BarSeries`` is expected.
+    """
+
+    def __init__(self, capacity: int = INTRADAY_BUFFER_SIZE):
+        self.capacity = capacity
+        self.values = np.full((len(SERIES_COLUMNS), capacity), np.nan, dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.volumes = np.zeros(capacity, dtype=np.float64)  # Volumen exacto (float32 no lo es por encima de 2**24)
+        self.pos = 0
+        self.size = 0
+        self.last_timestamp: Optional[int] = None
+
+        # Ventanas de precios de cierre y retornos
+        self.closes = {w: _RollingWindow(w) for w in (10, 20, 50, 100, 200)}
+        self.returns = _RollingWindow(20)
+        self.recent_closes = _RollingWindow(6)
+
+        # EMAs (MACD) y medias de Wilder (RSI, ADX)
+        self.ema_fast = self.ema_slow = self.ema_signal = None
+        self.macd_count = 0
+        self.avg_gain = self.avg_loss = None
+        self.rsi_count = 0
+        self.prev_high = self.prev_low = self.prev_close = None
+        self.tr_sum = self.plus_dm_sum = self.minus_dm_sum = 0.0
+        self.adx_value = math.nan
+        self.dx_sum = 0.0
+        self.adx_count = 0
+        self.obv = 0.0
+
+    # Inserta una barra y actualiza los indicadores en streaming
+    def append(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        """Ingest one bar and update every indicator incrementally"""
+        prev_close = self.prev_close
+
+        for window in self.closes.values():
+            window.push(close)
+
+        # Retornos
+        ret_1 = close / prev_close - 1.0 if prev_close else math.nan
+        if not math.isnan(ret_1):
+            self.returns.push(ret_1)
+        self.recent_closes.push(close)
+        ret_5 = math.nan
+        if self.recent_closes.full:
+            ret_5 = close / self.recent_closes.values[self.recent_closes.pos] - 1.0
+
+        # MACD (EMAs 12/26/9)
+        if self.ema_fast is None:
+            self.ema_fast = self.ema_slow = close
+        else:
+            self.ema_fast += (close - self.ema_fast) * (2.0 / 13.0)
+            self.ema_slow += (close - self.ema_slow) * (2.0 / 27.0)
+        self.macd_count += 1
+        macd = self.ema_fast - self.ema_slow if self.macd_count >= 26 else math.nan
+        macd_signal = math.nan
+        if not math.isnan(macd):
+            self.ema_signal = macd if self.ema_signal is None else self.ema_signal + (macd - self.ema_signal) * 0.2
+            if self.macd_count >= 34:
+                macd_signal = self.ema_signal
+
+        # RSI de Wilder (14)
+        rsi = math.nan
+        if prev_close is not None:
+            change = close - prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if self.avg_gain is None:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += (gain - self.avg_gain) / 14.0
+                self.avg_loss += (loss - self.avg_loss) / 14.0
+            self.rsi_count += 1
+            if self.rsi_count >= 14:
+                rsi = 100.0 if self.avg_loss == 0 else 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+        # ADX de Wilder (14)
+        if prev_close is not None:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            up, down = high - self.prev_high, self.prev_low - low
+            plus_dm = up if up > down and up > 0 else 0.0
+            minus_dm = down if down > up and down > 0 else 0.0
+            self.adx_count += 1
+            if self.adx_count <= 14:
+                self.tr_sum += tr
+                self.plus_dm_sum += plus_dm
+                self.minus_dm_sum += minus_dm
+            else:
+                self.tr_sum += tr - self.tr_sum / 14.0
+                self.plus_dm_sum += plus_dm - self.plus_dm_sum / 14.0
+                self.minus_dm_sum += minus_dm - self.minus_dm_sum / 14.0
+            if self.adx_count >= 14 and self.tr_sum > 0:
+                plus_di = 100.0 * self.plus_dm_sum / self.tr_sum
+                minus_di = 100.0 * self.minus_dm_sum / self.tr_sum
+                di_total = plus_di + minus_di
+                dx = 100.0 * abs(plus_di - minus_di) / di_total if di_total > 0 else 0.0
+                if self.adx_count < 27:
+                    self.dx_sum += dx
+                elif self.adx_count == 27:
+                    self.adx_value = (self.dx_sum + dx) / 14.0
+                else:
+                    self.adx_value += (dx - self.adx_value) / 14.0
+
+        # OBV
+        self.obv += -volume if prev_close is not None and close < prev_close else volume
+
+        # Bandas de Bollinger (20, 2 desviaciones)
+        window_20 = self.closes[20]
+        bb_middle = window_20.mean()
+        bb_std = window_20.std()
+        bb_upper = bb_middle + 2.0 * bb_std
+        bb_lower = bb_middle - 2.0 * bb_std
+
+        # Una sola escritura por barra, en el orden de SERIES_COLUMNS
+        self.values[:, self.pos] = (
+            open_, high, low, close, volume,
+            rsi, macd, macd_signal, macd - macd_signal,
+            self.closes[10].mean(), bb_middle, self.closes[50].mean(),
+            self.closes[100].mean(), self.closes[200].mean(),
+            bb_upper, bb_middle, bb_lower, (bb_upper - bb_lower) / bb_middle * 100.0,
+            self.adx_value, self.obv, ret_1, ret_5, self.returns.std(ddof=1),
+        )
+        self.timestamps[self.pos] = timestamp
+        self.volumes[self.pos] = volume
+
+        self.pos = (self.pos + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        self.last_timestamp = timestamp
+
+    def snapshot(self, tz: Optional[str] = 'America/New_York') -> BarSeries:
+        """Copy of the buffered bars in chronological order"""
+        if self.size < self.capacity:
+            values, timestamps = self.values[:, :self.size], self.timestamps[:self.size]
+            volumes = self.volumes[:self.size]
+        else:
+            values = np.concatenate((self.values[:, self.pos:], self.values[:, :self.pos]), axis=1)
+            timestamps = np.concatenate((self.timestamps[self.pos:], self.timestamps[:self.pos]))
+            volumes = np.concatenate((self.volumes[self.pos:], self.volumes[:self.pos]))
+        return BarSeries(timestamps, values, SERIES_COLUMNS, tz=tz, volume=volumes)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class ReplaySource:
+    """Replays recorded minute bars from a CSV file.
+
+    The file needs a ``timestamp`` column (ISO 8601 or epoch seconds) followed by
+    ``Open``, ``High``, ``Low``, ``Close`` and ``Volume``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def bars(self) -> Iterator[Bar]:
+        with open(self.path, newline='') as handle:
+            for row in csv.DictReader(handle):
+                raw_ts = row['timestamp']
+                if raw_ts.replace('.', '', 1).isdigit():
+                    timestamp = int(float(raw_ts) * 1_000_000_000)
+                else:
+                    timestamp = pd.Timestamp(raw_ts).value
+                yield (timestamp, float(row['Open']), float(row['High']), float(row['Low']),
+                       float(row['Close']), float(row['Volume']))
+
+
+class IntradayService:
+    """Ring buffers for an allowlist of tickers.
+
+    Only tickers in ``tickers`` get a buffer, so memory is bounded by
+    ``len(tickers) * capacity`` bars regardless of what clients ask for.
+    """
+
+    def __init__(self, interval: str = INTRADAY_INTERVAL, capacity: int = INTRADAY_BUFFER_SIZE,
+                 tickers: Iterable[str] = INTRADAY_TICKERS):
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported intraday interval: {interval}")
+        self.interval = interval
+        self.capacity = capacity
+        self.tickers = frozenset(tickers)
+        self.buffers: Dict[str, IntradayBuffer] = {}
+        self.last_poll: Dict[str, datetime] = {}
+        self.bars_ingested = 0
+        self.ingest_seconds = 0.0
+        self.breaker = CircuitBreaker('yahoo-intraday', UPSTREAM_FAILURE_THRESHOLD, UPSTREAM_RESET_TIMEOUT)
+        self.stale_serves = 0
+
+    def buffer(self, ticker: str) -> IntradayBuffer:
+        if ticker not in self.tickers:
+            raise ValueError(f"Ticker not enabled for intraday data: {ticker}")
+        if ticker not in self.buffers:
+            self.buffers[ticker] = IntradayBuffer(self.capacity)
+        return self.buffers[ticker]
+
+    # Ingiere barras nuevas (las repetidas o antiguas se ignoran)
+    def ingest(self, ticker: str, bars) -> int:
+        """Ingest an iterable of bars into the ticker's ring buffer"""
+        buffer = self.buffer(ticker)
+        start = time.perf_counter()
+        count = 0
+        for timestamp, open_, high, low, close, volume in bars:
+            if buffer.last_timestamp is not None and timestamp <= buffer.last_timestamp:
+                continue
+            buffer.append(timestamp, open_, high, low, close, volume)
+            count += 1
+        self.ingest_seconds += time.perf_counter() - start
+        self.bars_ingested += count
+        return count
+
+    # Reproduce un fichero grabado y mide el rendimiento de ingesta
+    def replay(self, ticker: str, source: ReplaySource) -> Dict:
+        """Feed a recorded source through the buffers and report throughput"""
+        bars = list(source.bars())
+        start = time.perf_counter()
+        count = self.ingest(ticker, bars)
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else float('inf')
+        if rate < INTRADAY_TARGET_BARS_PER_SECOND:
+            logger.warning(f"Intraday ingest below target: {rate:.0f} < {INTRADAY_TARGET_BARS_PER_SECOND} bars/s")
+        return {'bars': count, 'seconds': elapsed, 'barsPerSecond': rate,
+                'targetBarsPerSecond': INTRADAY_TARGET_BARS_PER_SECOND}
+
+    # Descarga barras intradía de Yahoo Finance (bloqueante, se ejecuta en un hilo)
+    def _download(self, ticker: str, period: str, timeout: float) -> pd.DataFrame:
+        return yf.Ticker(ticker).history(period=period, interval=self.interval, timeout=timeout)
+
+    # Descarga las últimas barras intradía de Yahoo Finance
+    async def poll(self, ticker: str, timeout: Optional[float] = None) -> Optional[BarSeries]:
+        """Fetch new intraday bars for a ticker at most once per bar interval.
+
+        The Yahoo call goes through the circuit breaker, bounded by ``timeout``.
+        If it fails, the buffered bars are returned with ``attrs['stale']`` set.
+        """
+        if ticker not in self.tickers:
+            raise ValueError(f"Ticker not enabled for intraday data: {ticker}")
+        stale = False
+        try:
+            now = datetime.now()
+            last = self.last_poll.get(ticker)
+            if last is None or (now - last).total_seconds() >= INTERVAL_SECONDS[self.interval]:
+                # Primera carga: días suficientes para calentar los indicadores
+                period = '5d' if ticker not in self.buffers else '1d'
+                timeout = UPSTREAM_TIMEOUT if timeout is None else min(timeout, UPSTREAM_TIMEOUT)
+                hist = await self.breaker.call(self._download, ticker, period, timeout, timeout=timeout)
+                self.last_poll[ticker] = now
+                if len(hist):
+                    index = pd.DatetimeIndex(hist.index)
+                    if index.tz is not None:
+                        index = index.tz_convert('UTC').tz_localize(None)
+                    # Solo barras cerradas: la barra en curso aún puede cambiar
+                    closed = (index + pd.Timedelta(seconds=INTERVAL_SECONDS[self.interval])) <= pd.Timestamp.utcnow().tz_localize(None)
+                    hist, index = hist[closed], index[closed]
+                    self.ingest(ticker, zip(
+                        index.asi8.tolist(),
+                        hist['Open'].tolist(), hist['High'].tolist(), hist['Low'].tolist(),
+                        hist['Close'].tolist(), hist['Volume'].astype(float).tolist()
+                    ))
+
+        except Exception as e:
+            logger.error(f"Error fetching intraday data for {ticker}: {e!r}")
+            stale = True
+
+        buffer = self.buffers.get(ticker)
+        if buffer is None or len(buffer) == 0:
+            return None
+        if stale:
+            # Se sirve el buffer existente como último dato bueno conocido
+            self.stale_serves += 1
+        series = buffer.snapshot()
+        series.attrs['stale'] = stale
+        return series
+
+    def stats(self) -> Dict:
+        rate = self.bars_ingested / self.ingest_seconds if self.ingest_seconds > 0 else 0.0
+        return {
+            'interval': self.interval,
+            'capacity': self.capacity,
+            'tickers': {ticker: len(buffer) for ticker, buffer in self.buffers.items()},
+            'barsIngested': self.bars_ingested,
+            'barsPerSecond': rate,
+            'targetBarsPerSecond': INTRADAY_TARGET_BARS_PER_SECOND,
+            'bufferBytes': sum(b.values.nbytes + b.timestamps.nbytes + b.volumes.nbytes for b in self.buffers.values()),
+            'upstream': self.breaker.stats(),
+            'staleServes': self.stale_serves
+        }
+
+# Global intraday service instance
+intraday_service = IntradayService()
+
+
+# Reproduce un CSV grabado y muestra el rendimiento de ingesta:
+#   python intraday_service.py tests/fixtures/intraday_1m.csv
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded intraday bars through the ring buffer")
+    parser.add_argument('path', help="CSV with timestamp,Open,High,Low,Close,Volume")
+    parser.add_argument('--ticker', default='REPLAY')
+    args = parser.parse_args()
+
+    service = IntradayService(tickers=[args.ticker])
+    report = service.replay(args.ticker, ReplaySource(args.path))
+    print(f"{report['bars']} bars in {report['seconds']:.4f} s: {report['barsPerSecond']:.0f} bars/s "
+          f"(target {report['targetBarsPerSecond']})")
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+
+# Máximo/mínimo móvil centrado; pandas usa una deque monótona, O(n) para cualquier ventana
+def _rolling_extreme(values: np.ndarray, window: int, kind: str) -> np.ndarray:
+    rolling = pd.Series(values).rolling(2 * window + 1, center=True)
+    return (rolling.max() if kind == 'max' else rolling.min()).to_numpy()
+
+
+def find_pivots(high: np.ndarray, low: np.ndarray, window: int = 5):
+    """Indices of swing highs and swing lows.
+
+    A bar is a swing high when its high is the maximum of the ``window`` bars on
+    each side (likewise for lows). Bars too close to either end are skipped.
+    """
+    pivot_high = np.flatnonzero(high == _rolling_extreme(high, window, 'max'))
+    pivot_low = np.flatnonzero(low == _rolling_extreme(low, window, 'min'))
+    return pivot_high, pivot_low
+
+
+def cluster_levels(prices: np.ndarray, volumes: np.ndarray, tolerance: float = 0.01) -> Dict[str, np.ndarray]:
+    """Group pivot prices into log-price buckets ``tolerance`` wide (relative).
+
+    Fixed-width buckets avoid the chaining of neighbour-gap clustering, where a
+    run of close pivots merges into one level spanning a wide range. Returns one
+    entry per occupied bucket: volume-weighted price, number of touches and total
+    volume, all computed with a few bincounts.
+    """
+    if len(prices) == 0:
+        empty = np.zeros(0)
+        return {'price': empty, 'touches': empty, 'volume': empty}
+
+    bucket = np.floor(np.log(prices) / np.log1p(tolerance)).astype(np.int64)
+    _, cluster = np.unique(bucket, return_inverse=True)
+
+    weights = np.where(volumes > 0, volumes, 1.0)
+    touches = np.bincount(cluster).astype(np.float64)
+    volume = np.bincount(cluster, weights=volumes)
+    price = np.bincount(cluster, weights=prices * weights) / np.bincount(cluster, weights=weights)
+    return {'price': price, 'touches': touches, 'volume': volume}
+
+
+def average_true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> float:
+    """Mean true range of the last ``window`` bars"""
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    return float(np.nanmean(true_range[-window:]))
+
+
+def support_resistance(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+                       window: int = 5, tolerance: float = 0.01, max_levels: int = 3,
+                       atr_band: float = 10.0) -> Dict[str, List]:
+    """Support and resistance levels around the last close, nearest first.
+
+    Only levels within ``atr_band`` average true ranges of the last close are
+    candidates, so levels left far behind in a long history are ignored.
+    Strength mixes the number of touches (70%) and traded volume at the pivots
+    (30%), each normalised to the strongest candidate.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.nan_to_num(np.asarray(volume, dtype=np.float64))
+    last_close = float(close[-1])
+
+    pivot_high, pivot_low = find_pivots(high, low, window)
+    prices = np.concatenate((high[pivot_high], low[pivot_low]))
+    volumes = np.concatenate((volume[pivot_high], volume[pivot_low]))
+    band = atr_band * average_true_range(high, low, close)
+    near = np.abs(prices - last_close) <= band
+    levels = cluster_levels(prices[near], volumes[near], tolerance)
+
+    if len(levels['price']) == 0:
+        return {'support': [], 'resistance': [], 'levels': []}
+
+    strength = 0.7 * levels['touches'] / levels['touches'].max()
+    if levels['volume'].max() > 0:
+        strength += 0.3 * levels['volume'] / levels['volume'].max()
+
+    def pick(mask: np.ndarray) -> np.ndarray:
+        candidates = np.flatnonzero(mask)
+        strongest = candidates[np.argsort(-strength[candidates], kind='stable')[:max_levels]]
+        return strongest[np.argsort(np.abs(levels['price'][strongest] - last_close))]
+
+    support = pick(levels['price'] < last_close)
+    resistance = pick(levels['price'] >= last_close)
+
+    return {
+        'support': [round(float(levels['price'][i]), 2) for i in support],
+        'resistance': [round(float(levels['price'][i]), 2) for i in resistance],
+        'levels': [
+            {
+                'price': round(float(levels['price'][i]), 2),
+                'touches': int(levels['touches'][i]),
+                'volume': float(levels['volume'][i]),
+                'strength': round(float(strength[i]), 3),
+                'type': 'support' if levels['price'][i] < last_close else 'resistance'
+            }
+            for i in np.concatenate((support, resistance))
+        ]
+    }
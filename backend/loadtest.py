@@ -0,0 +1,240 @@
+"""Open-loop load generator for the SP500 Predictor API.
+
+Replays a weighted endpoint mix at a fixed request rate and reports p50/p95/p99
+latency, error rate and achieved RPS per endpoint. Latency is measured from
+each request's scheduled send time, so a server that falls behind shows up as
+latency instead of silently lowering the offered rate.
+
+Examples::
+
+    # Start a local server with Yahoo/S3 fixtures (see loadtest_fixtures.py) and load it
+    python loadtest.py --serve --workers 2 --rate 200 --duration 30
+
+    # Compare cache settings
+    python loadtest.py --serve --env MARKET_DATA_CACHE_DURATION=60 --rate 200
+
+    # Load an already running server
+    python loadtest.py --url http://127.0.0.1:8000 --mix "/health=1,/api/market/current=4"
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+DEFAULT_MIX = (
+    "/api/prediction=2,"
+    "/api/market/current=4,"
+    "/api/market/historical?period=1mo=2,"
+    "/api/market/historical?period=3mo=1,"
+    "/api/market/historical?period=1y=1,"
+    "/health=1"
+)
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    """Parse ``path=weight,path=weight`` (the weight follows the last ``=``)"""
+    entries = []
+    for item in filter(None, (part.strip() for part in mix.split(','))):
+        path, _, weight = item.rpartition('=')
+        if not path or not path.startswith('/'):
+            raise ValueError(f"Invalid mix entry: {item!r}")
+        entries.append((path, float(weight)))
+    if not entries or sum(weight for _, weight in entries) <= 0:
+        raise ValueError("The endpoint mix needs at least one positive weight")
+    return entries
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.dropped = 0  # No enviadas: límite de peticiones en vuelo alcanzado
+
+    def record(self, latency: float, status: str, ok: bool):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        completed = len(self.latencies)
+        attempted = completed + self.dropped
+        if completed:
+            p50, p95, p99 = np.percentile(np.asarray(self.latencies) * 1000, [50, 95, 99])
+        else:
+            p50 = p95 = p99 = float('nan')
+        return {
+            'requests': completed,
+            'dropped': self.dropped,
+            'rps': round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50Ms': round(float(p50), 2),
+            'p95Ms': round(float(p95), 2),
+            'p99Ms': round(float(p99), 2),
+            'errorRate': round((self.errors + self.dropped) / attempted, 4) if attempted else 0.0,
+            'statuses': dict(sorted(self.statuses.items()))
+        }
+
+
+async def run_load(url: str, mix: List[Tuple[str, float]], rate: float, duration: float,
+                   max_in_flight: int = 256, timeout: float = 10.0, seed: int = 0) -> Dict:
+    """Send ``rate * duration`` requests drawn from ``mix`` at evenly spaced times"""
+    paths = [path for path, _ in mix]
+    weights = [weight for _, weight in mix]
+    stats = {path: EndpointStats() for path in paths}
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    loop = asyncio.get_running_loop()
+    in_flight = 0
+
+    async def send(client: httpx.AsyncClient, path: str, scheduled: float):
+        nonlocal in_flight
+        try:
+            response = await client.get(path)
+            status, ok = str(response.status_code), response.status_code < 400
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        finally:
+            in_flight -= 1
+        stats[path].record(loop.time() - scheduled, status, ok)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        tasks = []
+        start = loop.time()
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            path = rng.choices(paths, weights)[0]
+            if in_flight >= max_in_flight:
+                stats[path].dropped += 1
+                continue
+            in_flight += 1
+            tasks.append(asyncio.create_task(send(client, path, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+
+    endpoints = {path: endpoint.summary(elapsed) for path, endpoint in stats.items()}
+    total = EndpointStats()
+    for endpoint in stats.values():
+        total.latencies.extend(endpoint.latencies)
+        total.dropped += endpoint.dropped
+        total.errors += endpoint.errors
+        for status, count in endpoint.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+    return {
+        'targetRps': rate,
+        'seconds': round(elapsed, 2),
+        'total': total.summary(elapsed),
+        'endpoints': endpoints
+    }
+
+
+def print_report(result: Dict):
+    header = f"{'endpoint':<40} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7}  statuses"
+    print(f"\nTarget {result['targetRps']} req/s over {result['seconds']} s")
+    print(header)
+    print('-' * len(header))
+    rows = list(result['endpoints'].items()) + [('TOTAL', result['total'])]
+    for path, row in rows:
+        statuses = ' '.join(f"{status}:{count}" for status, count in row['statuses'].items())
+        if row['dropped']:
+            statuses += f" dropped:{row['dropped']}"
+        print(f"{path:<40} {row['requests']:>7} {row['rps']:>8} {row['p50Ms']:>9} {row['p95Ms']:>9} "
+              f"{row['p99Ms']:>9} {row['errorRate'] * 100:>6.2f}%  {statuses}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Arranca uvicorn con los fixtures locales y espera a que responda /health
+def start_fixture_server(workers: int, env_overrides: Dict[str, str], port: Optional[int] = None,
+                         startup_timeout: float = 120.0) -> Tuple[subprocess.Popen, str]:
+    port = port or _free_port()
+    work_dir = tempfile.mkdtemp(prefix='loadtest-')
+    env = {**os.environ, 'HISTORY_DB_PATH': os.path.join(work_dir, 'history.db'), **env_overrides}
+    log_path = os.path.join(work_dir, 'server.log')
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'loadtest_fixtures:app', '--host', '127.0.0.1',
+             '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    print(f"Fixture server log: {log_path}")
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Fixture server exited with code {process.returncode}, see {log_path}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Fixture server did not become healthy within {startup_timeout} s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for the SP500 Predictor API")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="Server to load (ignored with --serve)")
+    parser.add_argument('--serve', action='store_true', help="Start a local server with Yahoo/S3 fixtures")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers for --serve")
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Setting for the --serve server (repeatable), e.g. MARKET_DATA_CACHE_DURATION=60")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Weighted endpoint mix: path=weight,...")
+    parser.add_argument('--rate', type=float, default=50.0, help="Target requests per second")
+    parser.add_argument('--duration', type=float, default=20.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Unmeasured seconds at the same rate first")
+    parser.add_argument('--max-in-flight', type=int, default=256, help="Requests beyond this are dropped")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Per-request timeout (s)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the endpoint sequence")
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    env_overrides = dict(item.split('=', 1) for item in args.env)
+    process = None
+    url = args.url
+    try:
+        if args.serve:
+            process, url = start_fixture_server(args.workers, env_overrides)
+            print(f"Fixture server on {url} ({args.workers} worker(s))")
+
+        if args.warmup > 0:
+            asyncio.run(run_load(url, mix, args.rate, args.warmup, args.max_in_flight, args.timeout, args.seed + 1))
+        result = asyncio.run(run_load(url, mix, args.rate, args.duration, args.max_in_flight, args.timeout, args.seed))
+        result['config'] = {'url': url, 'workers': args.workers if args.serve else None, 'env': env_overrides}
+
+        print_report(result)
+        if args.json_path:
+            with open(args.json_path, 'w') as handle:
+                json.dump(result, handle, indent=2)
+        return 0
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Local stand-ins for Yahoo Finance and S3, used by ``loadtest.py``.
+
+Importing this module patches ``yfinance.Ticker`` and the model service's S3
+client and re-exports the FastAPI app, so ``uvicorn loadtest_fixtures:app``
+serves the real API without touching the network. ``LOADTEST_UPSTREAM_LATENCY``
+(seconds) adds a delay to every Yahoo call to mimic the real upstream.
+"""
+import io
+import os
+import re
+import time
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from feature_schema import FEATURE_SCHEMA
+
+UPSTREAM_LATENCY = float(os.getenv('LOADTEST_UPSTREAM_LATENCY', 0.2))
+FIXTURE_SEED = int(os.getenv('LOADTEST_SEED', 42))
+
+# Barras diarias aproximadas por unidad de periodo de yfinance
+_PERIOD_DAYS = {'d': 1, 'wk': 5, 'mo': 21, 'y': 252}
+_INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60}
+
+
+def _period_days(period: str) -> int:
+    if period == 'max':
+        return 252 * 30
+    if period == 'ytd':
+        return max(1, pd.Timestamp.today().dayofyear * 5 // 7)
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if match is None:
+        raise ValueError(f"Unsupported period: {period}")
+    return int(match.group(1)) * _PERIOD_DAYS[match.group(2)]
+
+
+@lru_cache(maxsize=64)
+def _bars(rows: int, freq: str, end: pd.Timestamp) -> pd.DataFrame:
+    """Deterministic random-walk OHLCV bars ending at ``end``"""
+    rng = np.random.default_rng(FIXTURE_SEED)
+    if freq == 'B':
+        index = pd.bdate_range(end=end.normalize(), periods=rows, tz='America/New_York')
+    else:
+        index = pd.date_range(end=end.floor(freq), periods=rows, freq=freq, tz='America/New_York')
+    close = 4500 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, rows)))
+    open_ = close * (1 + rng.normal(0, 0.002, rows))
+    spread = np.abs(rng.normal(0, 0.006, rows))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Volume': rng.integers(2_000_000_000, 5_000_000_000, rows).astype(np.float64),
+    }, index=index)
+
+
+class FixtureTicker:
+    """Drop-in for ``yfinance.Ticker`` serving synthetic history"""
+
+    calls = 0
+
+    def __init__(self, ticker: str, *args, **kwargs):
+        self.ticker = ticker
+
+    def history(self, period: str = '1mo', interval: str = '1d', **kwargs) -> pd.DataFrame:
+        FixtureTicker.calls += 1
+        if UPSTREAM_LATENCY > 0:
+            time.sleep(UPSTREAM_LATENCY)
+        now = pd.Timestamp.now(tz='America/New_York')
+        days = _period_days(period)
+        if interval in _INTERVAL_MINUTES:
+            minutes = _INTERVAL_MINUTES[interval]
+            return _bars(days * 390 // minutes, f"{minutes}min", now.floor('1min')).copy()
+        return _bars(days, 'B', now.normalize()).copy()
+
+
+class _FixtureBody:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def iter_chunks(self, chunk_size: int = 1024 * 1024):
+        for offset in range(0, len(self.data), chunk_size):
+            yield self.data[offset:offset + chunk_size]
+
+
+class FixtureS3Client:
+    """Minimal S3 client answering the HEAD and ranged GETs used by ModelService"""
+
+    def __init__(self, data: bytes, etag: str = '"loadtest-fixture"'):
+        self.data = data
+        self.etag = etag
+
+    def head_object(self, Bucket=None, Key=None, **kwargs):
+        return {'ContentLength': len(self.data), 'ETag': self.etag, 'VersionId': 'loadtest-fixture'}
+
+    def get_object(self, Bucket=None, Key=None, Range=None, IfMatch=None, **kwargs):
+        if IfMatch is not None and IfMatch != self.etag:
+            raise ValueError("PreconditionFailed")
+        data = self.data
+        if Range is not None:
+            start, end = (int(value) for value in Range.removeprefix('bytes=').split('-'))
+            data = data[start:end + 1]
+        return {'Body': _FixtureBody(data), 'ContentLength': len(data)}
+
+
+def fixture_model_bytes() -> bytes:
+    """Small XGBoost classifier with the FEATURE_SCHEMA layout, serialized with joblib"""
+    import xgboost as xgb
+
+    rng = np.random.default_rng(FIXTURE_SEED)
+    features = rng.normal(size=(2000, len(FEATURE_SCHEMA)))
+    labels = (features[:, :3].sum(axis=1) + rng.normal(0, 0.5, 2000) > 0).astype(np.float32)
+    dtrain = xgb.DMatrix(features, label=labels, feature_names=list(FEATURE_SCHEMA.names))
+    booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 4, 'eta': 0.1}, dtrain, num_boost_round=100)
+    buffer = io.BytesIO()
+    joblib.dump(booster, buffer)
+    return buffer.getvalue()
+
+
+# Sustituye Yahoo Finance y S3 antes de cargar la aplicación
+yf.Ticker = FixtureTicker
+
+from main import app  # noqa: E402
+from model_service import model_service  # noqa: E402
+
+model_service.s3_client = FixtureS3Client(fixture_model_bytes())
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+import asyncio
 import logging
 import os
 import sys
@@ -11,6 +12,15 @@ from datetime import datetime, timedelta
 
 from model_service import model_service
 from market_service import market_service
+from intraday_service import intraday_service
+from feature_schema import FEATURE_SCHEMA
+from resilience import Deadline
+from history_store import history_store
+from news_service import news_service
+from workers import PoolSaturated, pool_stats, shutdown_pools
+from downsampling import RESOLUTIONS
+from bar_series import json_float, json_floats
+from config import MARKET_DEADLINE, HISTORICAL_DEADLINE, PREDICTION_DEADLINE, INTRADAY_DEADLINE, NEWS_LOOKBACK_DAYS
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +70,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Respuesta rápida cuando una etapa de CPU está saturada
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    logger.warning(f"Rechazando {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Servidor saturado ({exc.stage}), reintentar más tarde"},
+        headers={"Retry-After": str(int(exc.retry_after))}
+    )
+
 class PredictionResponse(BaseModel):
     prediction: float
     value: float  # Para compatibilidad hacia atrás
@@ -69,9 +89,11 @@ class PredictionResponse(BaseModel):
     probability: float
     targetPrice: float
     timeframe: str
-    factors: Dict[str, float]
+    factors: Dict[str, float]  # Peso relativo de cada grupo de factores (SHAP)
+    factorContributions: Dict[str, float] = {}  # Aporte SHAP con signo por grupo, más el sesgo
     technicalIndicators: Dict
     lastUpdated: str
+    stale: bool = False  # True si se sirvió el último dato bueno conocido
 
 class MarketDataResponse(BaseModel):
     price: float
@@ -83,6 +105,7 @@ class MarketDataResponse(BaseModel):
     change: float
     changePercent: float
     timestamp: str
+    stale: bool = False
 
 # Endpoint raíz con información de diagnóstico
 @app.get("/")
@@ -129,7 +152,7 @@ async def health_check():
 async def get_current_market_data():
     """Obtener datos actuales del mercado SP500"""
     try:
-        data = await market_service.get_current_sp500_data()
+        data = await market_service.get_current_sp500_data(Deadline(MARKET_DEADLINE).remaining())
         if data is None:
             raise HTTPException(status_code=500, detail="Error al obtener datos del mercado")
         
@@ -145,10 +168,11 @@ async def get_prediction():
     """Obtener predicción del SP500 utilizando el modelo XGBoost"""
     try:
         logger.info("Iniciando solicitud de predicción")
+        deadline = Deadline(PREDICTION_DEADLINE)
         
         # Obtener datos actuales del mercado
         logger.info("Obteniendo datos del mercado...")
-        market_data = await market_service.get_current_sp500_data()
+        market_data = await market_service.get_current_sp500_data(deadline.remaining())
         if market_data is None:
             logger.error("Error al obtener datos del mercado")
             raise HTTPException(status_code=500, detail="Error al obtener datos del mercado")
@@ -156,15 +180,16 @@ async def get_prediction():
         
         # Obtener características para la predicción
         logger.info("Preparando características para la predicción...")
-        features = await market_service.get_features_for_prediction()
+        features = await market_service.get_features_for_prediction(deadline.remaining())
         if features is None:
             logger.error("Error al preparar características")
             raise HTTPException(status_code=500, detail="Error al preparar características")
         logger.info(f"Características preparadas: {len(features)} características")
         
-        # Realizar la predicción
+        # Realizar la predicción (cacheada por versión del modelo y vela, con atribución SHAP)
         logger.info("Realizando la predicción...")
-        prediction_result = await model_service.predict(features)
+        bar_ts = int(datetime.fromisoformat(market_data['timestamp']).timestamp())
+        prediction_result = await model_service.predict(features, bar_ts)
         if prediction_result is None:
             logger.error("Error al realizar la predicción")
             raise HTTPException(status_code=500, detail="Error al realizar la predicción")
@@ -173,11 +198,13 @@ async def get_prediction():
         # Obtener indicadores técnicos
         logger.info("Obteniendo indicadores técnicos...")
         try:
-            tech_indicators = await market_service.get_technical_indicators_summary()
+            tech_indicators = await market_service.get_technical_indicators_summary(deadline.remaining())
             if tech_indicators is None:
                 logger.error("Error al obtener indicadores técnicos")
                 raise HTTPException(status_code=500, detail="Error al obtener indicadores técnicos")
             logger.info("Indicadores técnicos obtenidos")
+        except PoolSaturated:
+            raise
         except Exception as tech_error:
             logger.error(f"Error al obtener indicadores técnicos: {tech_error}")
             # Usar un fallback o indicadores técnicos simulados
@@ -217,50 +244,170 @@ async def get_prediction():
             probability=prediction_value,
             targetPrice=target_price,
             timeframe="5 días",
-            factors={
-                "technical": 0.7,
-                "sentiment": 0.2,
-                "momentum": 0.1
-            },
+            factors=prediction_result['factors'],
+            factorContributions=prediction_result['factorContributions'],
             technicalIndicators=tech_indicators,
-            lastUpdated=datetime.now().isoformat()
+            lastUpdated=datetime.now().isoformat(),
+            stale=market_data.get('stale', False) or market_service.is_stale("6mo")
+        )
+        
+        # Guardar en el histórico (escritura en lote fuera de la petición)
+        history_store.record(
+            bar_ts=bar_ts,
+            model_version=model_service.model_version or "unknown",
+            prediction=prediction_value,
+            confidence=prediction_result['confidence'],
+            features=features,
+            target_price=target_price,
+            direction=direction
         )
         
         return response
         
+    except PoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error en el endpoint de predicción: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Devuelve el histórico de predicciones publicadas
+@app.get("/api/prediction/history")
+async def get_prediction_history(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                 model_version: Optional[str] = None, limit: int = 500):
+    """Obtener predicciones guardadas en un rango de fechas de barra"""
+    try:
+        rows = await asyncio.to_thread(
+            history_store.query,
+            start=int(start.timestamp()) if start else None,
+            end=int(end.timestamp()) if end else None,
+            model_version=model_version,
+            limit=max(1, min(limit, 5000))
+        )
+        for row in rows:
+            row['barTimestamp'] = datetime.fromtimestamp(row['barTimestamp']).astimezone().isoformat()
+            row['createdAt'] = datetime.fromtimestamp(row['createdAt']).astimezone().isoformat()
+        return {"data": rows}
+        
+    except Exception as e:
+        logger.error(f"Error al obtener histórico de predicciones: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Devuelve el sentimiento agregado de noticias (Polygon.io, cacheado en el backend)
+@app.get("/api/news/sentiment")
+async def get_news_sentiment(days: int = 7, limit: int = 10):
+    """Obtener sentimiento agregado y noticias más relevantes del SP500.
+
+    `days` se limita a `NEWS_LOOKBACK_DAYS`, la ventana que guarda el servicio de noticias.
+    """
+    try:
+        result = await news_service.get_sentiment(max(1, min(days, NEWS_LOOKBACK_DAYS)), max(1, min(limit, 50)))
+        if result is None:
+            raise HTTPException(status_code=503, detail="Servicio de noticias no configurado o no disponible")
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener sentimiento de noticias: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Devuelve datos históricos del mercado SP500
 @app.get("/api/market/historical")
-async def get_historical_data(period: str = "1mo"):
-    """Obtener datos históricos del mercado"""
+async def get_historical_data(period: str = "1mo", points: Optional[int] = None, resolution: Optional[str] = None):
+    """Obtener datos históricos del mercado.
+
+    Sin `points` ni `resolution` devuelve los últimos 30 días. `resolution` (daily/weekly/monthly)
+    agrega las velas y `points` reduce la serie con LTTB sobre el cierre.
+    """
     try:
-        hist_data = await market_service.get_historical_data(period)
+        if resolution is not None and resolution not in RESOLUTIONS:
+            raise HTTPException(status_code=400, detail=f"resolution debe ser uno de {list(RESOLUTIONS)}")
+        if points is not None and not 3 <= points <= 5000:
+            raise HTTPException(status_code=400, detail="points debe estar entre 3 y 5000")
+        
+        # Solo OHLCV: no se calcula ningún indicador
+        hist_data = await market_service.get_historical_series(period, Deadline(HISTORICAL_DEADLINE).remaining())
         if hist_data is None:
             raise HTTPException(status_code=500, detail="Error al obtener datos históricos")
         
-        # Convertir a lista de diccionarios
-        data = []
-        for idx, row in hist_data.iterrows():
-            data.append({
-                "timestamp": idx.isoformat(),
-                "price": float(row['Close']),
-                "open": float(row['Open']),
-                "high": float(row['High']),
-                "low": float(row['Low']),
-                "volume": int(row['Volume']),
-                "change": float(row['Close'] - row['Open']),
-                "changePercent": float((row['Close'] - row['Open']) / row['Open'] * 100)
-            })
+        if points is None and resolution is None:
+            recent = hist_data.tail(30)  # Devolver últimos 30 días
+        else:
+            recent = market_service.get_chart_series(hist_data, resolution or 'daily', points)
+        
+        # Convertir a lista de diccionarios (precios sin ruido de float32, volumen exacto)
+        data = [
+            {
+                "timestamp": ts.isoformat(),
+                "price": c,
+                "open": o,
+                "high": h,
+                "low": l,
+                "volume": int(v),
+                "change": c - o,
+                "changePercent": (c - o) / o * 100
+            }
+            for ts, c, o, h, l, v in zip(
+                recent.index(), json_floats(recent['Close']), json_floats(recent['Open']),
+                json_floats(recent['High']), json_floats(recent['Low']), recent['Volume'].tolist()
+            )
+        ]
         
-        return {"data": data[-30:]}  # Devolver últimos 30 días
+        return {"data": data, "stale": bool(hist_data.attrs.get('stale'))}
         
+    except (HTTPException, PoolSaturated):
+        raise
     except Exception as e:
         logger.error(f"Error al obtener datos históricos: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Devuelve barras intradía (1m/5m) con indicadores calculados en streaming
+@app.get("/api/market/intraday")
+async def get_intraday_data(ticker: str = "^GSPC", limit: int = 390):
+    """Obtener barras intradía del buffer circular (solo tickers de INTRADAY_TICKERS)"""
+    try:
+        if ticker not in intraday_service.tickers:
+            raise HTTPException(status_code=400, detail=f"ticker debe ser uno de {sorted(intraday_service.tickers)}")
+        
+        series = await intraday_service.poll(ticker, Deadline(INTRADAY_DEADLINE).remaining())
+        if series is None:
+            raise HTTPException(status_code=500, detail="Error al obtener datos intradía")
+        
+        recent = series.tail(max(1, min(limit, len(series))))
+        data = [
+            {
+                "timestamp": ts.isoformat(),
+                "price": c,
+                "open": o,
+                "high": h,
+                "low": l,
+                "volume": int(v)
+            }
+            for ts, o, h, l, c, v in zip(
+                recent.index(), json_floats(recent['Open']), json_floats(recent['High']),
+                json_floats(recent['Low']), json_floats(recent['Close']), recent['Volume'].tolist()
+            )
+        ]
+        
+        return {
+            "interval": intraday_service.interval,
+            "data": data,
+            "stale": bool(series.attrs.get('stale')),
+            "indicators": {
+                "rsi": json_float(recent.latest('rsi')),
+                "macd": json_float(recent.latest('macd')),
+                "sma20": json_float(recent.latest('sma_20')),
+                "vol20": json_float(recent.latest('vol_20'))
+            },
+            "stats": intraday_service.stats()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener datos intradía: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Endpoint de depuración para datos del mercado
 @app.get("/debug/market-data")
 async def debug_market_data():
@@ -287,6 +434,18 @@ async def debug_features():
         logger.error(f"Depuración: Error en características: {str(e)}")
         return {"success": False, "error": str(e)}
 
+# Endpoint de depuración para el estado de las fuentes externas
+@app.get("/debug/upstream")
+async def debug_upstream():
+    """Estado del circuit breaker de Yahoo y número de respuestas servidas con datos antiguos"""
+    return {"success": True, "upstream": {**market_service.upstream_stats(), "yahooIntraday": intraday_service.breaker.stats()}}
+
+# Endpoint de depuración para la saturación de los pools de CPU
+@app.get("/debug/workers")
+async def debug_workers():
+    """Ocupación, colas y rechazos de cada etapa de CPU"""
+    return {"success": True, "pools": pool_stats()}
+
 # Endpoint de depuración para estado del modelo
 @app.get("/debug/model")
 async def debug_model():
@@ -297,12 +456,16 @@ async def debug_model():
         # Verificar si el modelo está cargado
         model_status = {
             "model_loaded": model_service.model is not None,
-            "model_type": str(type(model_service.model)) if model_service.model else None
+            "model_type": str(type(model_service.model)) if model_service.model else None,
+            "model_version": model_service.model_version,
+            "download": model_service.download_stats,
+            "rejected": model_service.rejected_reason,
+            "prediction_cache": model_service.cache_stats()
         }
         
         # Intentar hacer una predicción simple con datos de ejemplo
         if model_service.model:
-            dummy_features = [6200.0] + [50.0] * 22  # 23 características en total
+            dummy_features = [50.0] * len(FEATURE_SCHEMA)
             try:
                 prediction = await model_service.predict(dummy_features)
                 model_status["dummy_prediction"] = prediction
@@ -354,10 +517,15 @@ async def railway_debug():
             "/railway-debug",
             "/api/market/current",
             "/api/prediction",
+            "/api/prediction/history",
+            "/api/news/sentiment",
             "/api/market/historical",
+            "/api/market/intraday",
             "/debug/market-data",
             "/debug/features", 
-            "/debug/model"
+            "/debug/model",
+            "/debug/upstream",
+            "/debug/workers"
         ]
     }
 
@@ -378,6 +546,13 @@ async def startup_event():
     
     logger.info("API de Predicción SP500 iniciada correctamente")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Vaciar la cola del histórico de predicciones y cerrar conexiones"""
+    history_store.close()
+    await news_service.close()
+    shutdown_pools()
+
 if __name__ == "__main__":
     import uvicorn
     from config import HOST, PORT, DEBUG
@@ -0,0 +1,135 @@
+import datetime as dt
+import math
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+
+import pandas as pd
+
+# Calendario de la NYSE: horario, festivos y cierres anticipados calculados localmente
+EXCHANGE_TZ = 'America/New_York'
+SESSION_OPEN = dt.time(9, 30)
+SESSION_CLOSE = dt.time(16, 0)
+EARLY_CLOSE = dt.time(13, 0)
+
+# Cierres extraordinarios que no siguen ninguna regla
+SPECIAL_CLOSURES = frozenset({
+    dt.date(2012, 10, 29), dt.date(2012, 10, 30),  # Huracán Sandy
+    dt.date(2018, 12, 5),                          # Funeral de George H. W. Bush
+    dt.date(2025, 1, 9),                           # Funeral de Jimmy Carter
+})
+
+
+def _easter(year: int) -> dt.date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (2 * e + 2 * i - h - k + 32) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    day = (h + l - 7 * m + 33 * month + 19) % 32
+    return dt.date(year, month, day)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> dt.date:
+    first = dt.date(year, month, 1)
+    return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> dt.date:
+    last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+    return last - dt.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+# Festivos en sábado se observan el viernes y en domingo el lunes
+def _observed(day: dt.date) -> dt.date:
+    if day.weekday() == 5:
+        return day - dt.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + dt.timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> FrozenSet[dt.date]:
+    """Full-day NYSE closures for ``year``"""
+    new_year = dt.date(year, 1, 1)
+    days = {
+        # Año Nuevo en sábado no se observa el viernes anterior
+        new_year + dt.timedelta(days=1) if new_year.weekday() == 6 else new_year,
+        _nth_weekday(year, 1, 0, 3),             # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),             # Washington's Birthday
+        _easter(year) - dt.timedelta(days=2),    # Good Friday
+        _last_weekday(year, 5, 0),               # Memorial Day
+        _observed(dt.date(year, 7, 4)),          # Independence Day
+        _nth_weekday(year, 9, 0, 1),             # Labor Day
+        _nth_weekday(year, 11, 3, 4),            # Thanksgiving
+        _observed(dt.date(year, 12, 25)),        # Christmas
+    }
+    if year >= 2022:
+        days.add(_observed(dt.date(year, 6, 19)))  # Juneteenth
+    days.update(day for day in SPECIAL_CLOSURES if day.year == year)
+    return frozenset(day for day in days if day.weekday() < 5)
+
+
+def is_trading_day(day: dt.date) -> bool:
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> FrozenSet[dt.date]:
+    """Sessions that close at 13:00 ET for ``year``"""
+    candidates = (
+        dt.date(year, 7, 3),                                        # Víspera de Independence Day
+        _nth_weekday(year, 11, 3, 4) + dt.timedelta(days=1),        # Viernes tras Thanksgiving
+        dt.date(year, 12, 24),                                      # Nochebuena
+    )
+    return frozenset(day for day in candidates if is_trading_day(day))
+
+
+def session(day: dt.date) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Open and close of the regular session on ``day`` (tz-aware), or None if closed"""
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else SESSION_CLOSE
+    return (pd.Timestamp.combine(day, SESSION_OPEN).tz_localize(EXCHANGE_TZ),
+            pd.Timestamp.combine(day, close).tz_localize(EXCHANGE_TZ))
+
+
+def next_open(now: dt.datetime) -> pd.Timestamp:
+    """First session open strictly after ``now``"""
+    local = pd.Timestamp(now).tz_convert(EXCHANGE_TZ)
+    day = local.date()
+    while True:
+        hours = session(day)
+        if hours is not None and hours[0] > local:
+            return hours[0]
+        day += dt.timedelta(days=1)
+
+
+def is_open(now: dt.datetime) -> bool:
+    local = pd.Timestamp(now).tz_convert(EXCHANGE_TZ)
+    hours = session(local.date())
+    return hours is not None and hours[0] <= local < hours[1]
+
+
+def cache_expiry(now: dt.datetime, interval: float, grace: float = 0.0) -> dt.datetime:
+    """When data fetched at ``now`` (tz-aware) stops being current.
+
+    During the session (extended by ``grace`` seconds after the close so the
+    final bar can settle upstream) entries expire at the next ``interval``
+    boundary counted from the open. Outside it the daily bar cannot change, so
+    entries stay valid until the next session opens.
+    """
+    local = pd.Timestamp(now).tz_convert(EXCHANGE_TZ)
+    hours = session(local.date())
+    if hours is not None:
+        open_, close = hours
+        settled = close + pd.Timedelta(seconds=grace)
+        if open_ <= local < settled:
+            elapsed = (local - open_).total_seconds()
+            boundary = open_ + pd.Timedelta(seconds=(math.floor(elapsed / interval) + 1) * interval)
+            return min(boundary, settled).to_pydatetime()
+    return next_open(local).to_pydatetime()
@@ -1,40 +1,103 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import ta
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
 import logging
 
+from bar_series import BarSeries, OHLCV_COLUMNS, json_float
+from config import (MARKET_CLOSE_GRACE, MARKET_DATA_CACHE_DURATION, UPSTREAM_FAILURE_THRESHOLD,
+                    UPSTREAM_RESET_TIMEOUT, UPSTREAM_TIMEOUT)
+from feature_schema import FEATURE_SCHEMA
+from indicators import INDICATOR_COLUMNS, IndicatorFrame, compute_indicators
+from downsampling import downsample, resample_ohlc
+from levels import support_resistance
+from market_calendar import cache_expiry
+from resilience import CircuitBreaker
+from workers import PoolSaturated, indicator_pool
+
 logger = logging.getLogger(__name__)
 
+# Barras mínimas para que los indicadores de la predicción y el resumen estén calentados
+MIN_INDICATOR_BARS = 50
+
+# Calcula todos los indicadores técnicos para el dataframe
+def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Calculate technical indicators for the dataframe"""
+    try:
+        inputs = {name: df[name].to_numpy(dtype=np.float64) for name in OHLCV_COLUMNS}
+        for name, values in compute_indicators(inputs, INDICATOR_COLUMNS).items():
+            df[name] = values
+        return df
+        
+    except Exception as e:
+        logger.error(f"Error calculating technical indicators: {str(e)}")
+        return df
+
 class MarketDataService:
     def __init__(self):
         self.sp500_ticker = "^GSPC"
-        self.cache = {}
-        self.cache_duration = 300  # 5 minutes
+        self.cache = {}  # key -> (data, expires_at)
+        self.cache_duration = MARKET_DATA_CACHE_DURATION  # refresh step during the session
+        self.breaker = CircuitBreaker('yahoo', UPSTREAM_FAILURE_THRESHOLD, UPSTREAM_RESET_TIMEOUT)
+        self.stale_serves: Dict[str, int] = {}
+
+    # Descarga el histórico de Yahoo Finance (bloqueante, se ejecuta en un hilo)
+    def _download_history(self, period: str, timeout: float) -> pd.DataFrame:
+        hist = yf.Ticker(self.sp500_ticker).history(period=period, timeout=timeout)
+        if hist is None or hist.empty:
+            raise ValueError(f"Empty response from Yahoo Finance for period {period}")
+        return hist
+
+    # Llama a Yahoo Finance a través del circuit breaker y con plazo máximo
+    async def _fetch_history(self, period: str, timeout: Optional[float] = None) -> pd.DataFrame:
+        """Fetch history under the breaker, bounded by the caller's remaining budget"""
+        timeout = UPSTREAM_TIMEOUT if timeout is None else min(timeout, UPSTREAM_TIMEOUT)
+        return await self.breaker.call(self._download_history, period, timeout, timeout=timeout)
+
+    # Caducidad según el calendario de la NYSE: velas en sesión, hasta la apertura fuera de ella
+    def _cache_expiry(self, now: datetime) -> datetime:
+        return cache_expiry(now, self.cache_duration, MARKET_CLOSE_GRACE)
+
+    # Devuelve el último dato bueno conocido cuando Yahoo no responde a tiempo
+    def _serve_stale(self, cache_key: str, reason: Exception):
+        if cache_key not in self.cache:
+            logger.error(f"No last-known-good data for {cache_key}: {reason!r}")
+            return None
+        self.stale_serves[cache_key] = self.stale_serves.get(cache_key, 0) + 1
+        logger.warning(f"Serving stale {cache_key} ({type(reason).__name__}: {reason})")
+        return self.cache[cache_key][0]
+
+    def is_stale(self, period: str) -> bool:
+        """Whether the last series served for ``period`` was last-known-good data"""
+        cached = self.cache.get(f"historical_{period}")
+        return bool(cached and cached[0].attrs.get('stale'))
+
+    def upstream_stats(self) -> Dict:
+        return {
+            'yahoo': self.breaker.stats(),
+            'staleServes': dict(self.stale_serves),
+            'cacheExpires': {key: expires_at.isoformat() for key, (_, expires_at) in self.cache.items()}
+        }
 
     # Obtiene el precio actual y datos básicos del SP500
-    async def get_current_sp500_data(self) -> Optional[Dict]:
+    async def get_current_sp500_data(self, timeout: Optional[float] = None) -> Optional[Dict]:
         """Get current SP500 price and basic info"""
+        cache_key = "current_sp500"
         try:
-            cache_key = "current_sp500"
-            now = datetime.now()
+            now = datetime.now(timezone.utc)
             
             # Check cache
             if cache_key in self.cache:
-                cached_data, cached_time = self.cache[cache_key]
-                if (now - cached_time).seconds < self.cache_duration:
+                cached_data, expires_at = self.cache[cache_key]
+                if now < expires_at:
                     return cached_data
 
             # Fetch from Yahoo Finance
-            ticker = yf.Ticker(self.sp500_ticker)
-            info = ticker.info
-            hist = ticker.history(period="2d")
+            hist = await self._fetch_history("2d", timeout)
             
             if len(hist) < 2:
-                logger.error("Not enough historical data")
-                return None
+                raise ValueError("Not enough historical data")
 
             current = hist.iloc[-1]
             previous = hist.iloc[-2]
@@ -48,181 +111,177 @@ class MarketDataService:
                 'previousClose': float(previous['Close']),
                 'change': float(current['Close'] - previous['Close']),
                 'changePercent': float((current['Close'] - previous['Close']) / previous['Close'] * 100),
-                'timestamp': current.name.isoformat()
+                'timestamp': current.name.isoformat(),
+                'stale': False
             }
             
             # Cache the result
-            self.cache[cache_key] = (data, now)
+            self.cache[cache_key] = (data, self._cache_expiry(now))
             
             return data
             
         except Exception as e:
             logger.error(f"Error fetching SP500 data: {str(e)}")
-            return None
+            stale = self._serve_stale(cache_key, e)
+            return {**stale, 'stale': True} if stale is not None else None
 
-    # Obtiene datos históricos del SP500 con indicadores técnicos
-    async def get_historical_data(self, period: str = "1y") -> Optional[pd.DataFrame]:
-        """Get historical SP500 data with technical indicators"""
+    # Obtiene las barras históricas del SP500 (OHLCV, sin indicadores calculados)
+    async def _load_series(self, period: str, timeout: Optional[float] = None) -> Optional[IndicatorFrame]:
+        cache_key = f"historical_{period}"
         try:
-            cache_key = f"historical_{period}"
-            now = datetime.now()
+            now = datetime.now(timezone.utc)
             
             # Check cache
             if cache_key in self.cache:
-                cached_data, cached_time = self.cache[cache_key]
-                if (now - cached_time).seconds < self.cache_duration:
+                cached_data, expires_at = self.cache[cache_key]
+                if now < expires_at:
                     return cached_data
 
             # Fetch historical data
-            ticker = yf.Ticker(self.sp500_ticker)
-            hist = ticker.history(period=period)
-            
-            if len(hist) < 50:  # Need enough data for indicators
-                logger.error("Not enough historical data for technical analysis")
-                return None
+            hist = await self._fetch_history(period, timeout)
 
-            # Calculate technical indicators
-            hist = self.calculate_technical_indicators(hist)
+            # Pack OHLCV into float32 arrays; indicators are filled in on demand
+            series = IndicatorFrame.from_ohlcv(hist)
+            series.attrs['stale'] = False
             
             # Cache the result
-            self.cache[cache_key] = (hist, now)
+            self.cache[cache_key] = (series, self._cache_expiry(now))
             
-            return hist
+            return series
             
         except Exception as e:
             logger.error(f"Error fetching historical data: {str(e)}")
-            return None
+            stale = self._serve_stale(cache_key, e)
+            if stale is not None:
+                stale.attrs['stale'] = True
+            return stale
 
-    # Calcula indicadores técnicos para el dataframe
-    def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate technical indicators for the dataframe"""
+    # Obtiene datos históricos del SP500 con los indicadores que pide el llamador
+    async def get_historical_series(self, period: str = "1y", timeout: Optional[float] = None,
+                                    indicators: Sequence[str] = ()) -> Optional[IndicatorFrame]:
+        """Get historical SP500 bars as an IndicatorFrame.
+
+        Only ``indicators`` (plus their dependencies) that the cached frame does
+        not have yet are computed, on the indicator pool; other columns are
+        computed the first time they are read. Callers that need warmed-up
+        indicators check the series length themselves.
+        """
+        series = await self._load_series(period, timeout)
+        if series is None or not indicators:
+            return series
         try:
-            # RSI
-            df['rsi'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
-            
-            # MACD
-            macd = ta.trend.MACD(df['Close'])
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_histogram'] = macd.macd_diff()
-            
-            # Moving Averages
-            df['sma_10'] = ta.trend.SMAIndicator(df['Close'], window=10).sma_indicator()
-            df['sma_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
-            df['sma_50'] = ta.trend.SMAIndicator(df['Close'], window=50).sma_indicator()
-            df['sma_100'] = ta.trend.SMAIndicator(df['Close'], window=100).sma_indicator()
-            df['sma_200'] = ta.trend.SMAIndicator(df['Close'], window=200).sma_indicator()
-            
-            # Bollinger Bands
-            bollinger = ta.volatility.BollingerBands(df['Close'], window=20)
-            df['bb_upper'] = bollinger.bollinger_hband()
-            df['bb_middle'] = bollinger.bollinger_mavg()
-            df['bb_lower'] = bollinger.bollinger_lband()
-            df['bb_width'] = bollinger.bollinger_wband()
-            
-            # ADX
-            df['adx'] = ta.trend.ADXIndicator(df['High'], df['Low'], df['Close']).adx()
-            
-            # OBV
-            df['obv'] = ta.volume.OnBalanceVolumeIndicator(df['Close'], df['Volume']).on_balance_volume()
-            
-            # Returns
-            df['ret_1d'] = df['Close'].pct_change(1)
-            df['ret_5d'] = df['Close'].pct_change(5)
-            
-            # Volatility
-            df['vol_20'] = df['ret_1d'].rolling(window=20).std()
-            
-            return df
+            missing = series.missing(indicators)
+            if missing:
+                series.store(await indicator_pool.run(compute_indicators, series.inputs_for(missing), missing))
+            return series
             
+        except PoolSaturated:
+            raise
         except Exception as e:
             logger.error(f"Error calculating technical indicators: {str(e)}")
-            return df
+            return None
 
-    async def get_features_for_prediction(self) -> Optional[List[float]]:
-        """Get current features for model prediction"""
+    async def get_historical_data(self, period: str = "1y", timeout: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """Get historical SP500 data with technical indicators as a DataFrame"""
+        series = await self.get_historical_series(period, timeout, INDICATOR_COLUMNS)
+        if series is None:
+            return None
+        return series.to_dataframe()
+
+    # Calcula indicadores técnicos para el dataframe
+    def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Calculate technical indicators for the dataframe"""
+        return calculate_technical_indicators(df)
+
+    async def get_features_for_prediction(self, timeout: Optional[float] = None) -> Optional[List[float]]:
+        """Get current features for model prediction, in model column order"""
+        matrix = await self.get_feature_matrix("6mo", -1, timeout)
+        if matrix is None:
+            return None
+        return matrix[0].astype(np.float64).tolist()
+
+    # Extrae la matriz de características para una fila o un rango de filas
+    async def get_feature_matrix(self, period: str = "6mo", rows=slice(None),
+                                 timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """Gather FEATURE_SCHEMA columns for the given rows in one vectorized step"""
         try:
-            hist = await self.get_historical_data("6mo")
-            if hist is None or len(hist) < 50:
+            hist = await self.get_historical_series(period, timeout, FEATURE_SCHEMA.source_columns)
+            if hist is None or len(hist) < MIN_INDICATOR_BARS:
                 return None
 
-            # Get the latest row with all indicators
-            latest = hist.iloc[-1]
-            
-            # Create feature vector (same order as training data)
-            features = [
-                latest['Close'],           # current_price
-                latest['rsi'],            # rsi
-                latest['macd'],           # macd_line
-                latest['macd_signal'],    # macd_signal
-                latest['sma_10'],         # sma_10
-                latest['sma_20'],         # sma_20
-                latest['sma_50'],         # sma_50
-                latest['sma_100'],        # sma_100
-                latest['sma_200'],        # sma_200
-                latest['bb_upper'],       # bb_upper
-                latest['bb_middle'],      # bb_middle
-                latest['bb_lower'],       # bb_lower
-                latest['bb_width'],       # bb_width
-                latest['adx'],            # adx
-                latest['obv'],            # obv
-                latest['ret_1d'],         # ret_1d
-                latest['ret_5d'],         # ret_5d
-                latest['vol_20'],         # vol_20
-                latest['Volume'],         # volume
-                # Add derived features
-                (latest['Close'] - latest['bb_lower']) / (latest['bb_upper'] - latest['bb_lower']),  # bb_position
-                latest['Close'] - latest['sma_20'],     # distance_to_sma_20
-                latest['Close'] - latest['sma_50'],     # distance_to_sma_50
-            ]
-            
-            # Replace NaN values with 0
-            features = [0.0 if pd.isna(x) else float(x) for x in features]
-            
-            return features
+            return FEATURE_SCHEMA.compile(hist.columns).gather(hist, rows)
             
+        except PoolSaturated:
+            raise
         except Exception as e:
             logger.error(f"Error preparing features: {str(e)}")
             return None
 
-    async def get_technical_indicators_summary(self) -> Optional[Dict]:
+    # Niveles de soporte/resistencia, calculados una vez por serie cacheada
+    def get_levels(self, hist: BarSeries) -> Dict:
+        """Support/resistance levels for a series, memoized in ``series.attrs``"""
+        if 'levels' not in hist.attrs:
+            hist.attrs['levels'] = support_resistance(hist['High'], hist['Low'], hist['Close'], hist['Volume'])
+        return hist.attrs['levels']
+
+    # Serie reducida para gráficos: solo se memoiza el remuestreo (una entrada por resolución)
+    def get_chart_series(self, hist: BarSeries, resolution: str = 'daily', points: Optional[int] = None) -> BarSeries:
+        """Resampled and/or LTTB-downsampled bars.
+
+        The resampled series is memoized in ``series.attrs`` (bounded by the
+        number of resolutions); LTTB runs per request because ``points`` comes
+        from the client and takes only a few milliseconds.
+        """
+        resampled = hist.attrs.setdefault('resampled', {})
+        if resolution not in resampled:
+            resampled[resolution] = resample_ohlc(hist, resolution)
+        return downsample(resampled[resolution], points)
+
+    async def get_technical_indicators_summary(self, timeout: Optional[float] = None) -> Optional[Dict]:
         """Get current technical indicators summary"""
         try:
-            hist = await self.get_historical_data("3mo")
-            if hist is None or len(hist) < 50:
+            hist = await self.get_historical_series("3mo", timeout, INDICATOR_COLUMNS)
+            if hist is None or len(hist) < MIN_INDICATOR_BARS:
                 return None
 
-            latest = hist.iloc[-1]
+            close = hist.latest('Close')
+            levels = self.get_levels(hist)
+
+            # Borde JSON: indicadores sin ruido de float32
+            def latest(name: str, default: float) -> float:
+                return json_float(hist.latest(name, default))
             
             return {
-                'rsi': float(latest['rsi']) if not pd.isna(latest['rsi']) else 50.0,
+                'rsi': latest('rsi', 50.0),
                 'macd': {
-                    'macd': float(latest['macd']) if not pd.isna(latest['macd']) else 0.0,
-                    'signal': float(latest['macd_signal']) if not pd.isna(latest['macd_signal']) else 0.0,
-                    'histogram': float(latest['macd_histogram']) if not pd.isna(latest['macd_histogram']) else 0.0
+                    'macd': latest('macd', 0.0),
+                    'signal': latest('macd_signal', 0.0),
+                    'histogram': latest('macd_histogram', 0.0)
                 },
                 'movingAverages': {
-                    'sma10': float(latest['sma_10']) if not pd.isna(latest['sma_10']) else latest['Close'],
-                    'sma20': float(latest['sma_20']) if not pd.isna(latest['sma_20']) else latest['Close'],
-                    'sma50': float(latest['sma_50']) if not pd.isna(latest['sma_50']) else latest['Close'],
-                    'sma100': float(latest['sma_100']) if not pd.isna(latest['sma_100']) else latest['Close'],
-                    'sma200': float(latest['sma_200']) if not pd.isna(latest['sma_200']) else latest['Close']
+                    'sma10': latest('sma_10', close),
+                    'sma20': latest('sma_20', close),
+                    'sma50': latest('sma_50', close),
+                    'sma100': latest('sma_100', close),
+                    'sma200': latest('sma_200', close)
                 },
                 'bollinger': {
-                    'upper': float(latest['bb_upper']) if not pd.isna(latest['bb_upper']) else latest['Close'] * 1.02,
-                    'middle': float(latest['bb_middle']) if not pd.isna(latest['bb_middle']) else latest['Close'],
-                    'lower': float(latest['bb_lower']) if not pd.isna(latest['bb_lower']) else latest['Close'] * 0.98
+                    'upper': latest('bb_upper', close * 1.02),
+                    'middle': latest('bb_middle', close),
+                    'lower': latest('bb_lower', close * 0.98)
                 },
-                'bollWidth': float(latest['bb_width']) if not pd.isna(latest['bb_width']) else 0.04,
-                'adx': float(latest['adx']) if not pd.isna(latest['adx']) else 25.0,
-                'obv': float(latest['obv']) if not pd.isna(latest['obv']) else 0.0,
-                'ret1d': float(latest['ret_1d']) if not pd.isna(latest['ret_1d']) else 0.0,
-                'ret5d': float(latest['ret_5d']) if not pd.isna(latest['ret_5d']) else 0.0,
-                'vol20': float(latest['vol_20']) if not pd.isna(latest['vol_20']) else 0.02,
-                'support': [],  # Would need more complex calculation
-                'resistance': []  # Would need more complex calculation
+                'bollWidth': latest('bb_width', 0.04),
+                'adx': latest('adx', 25.0),
+                'obv': latest('obv', 0.0),
+                'ret1d': latest('ret_1d', 0.0),
+                'ret5d': latest('ret_5d', 0.0),
+                'vol20': latest('vol_20', 0.02),
+                'support': levels['support'],
+                'resistance': levels['resistance']
             }
             
+        except PoolSaturated:
+            raise
         except Exception as e:
             logger.error(f"Error getting technical indicators: {str(e)}")
             return None
@@ -1,23 +1,151 @@
+import asyncio
 import boto3
 import joblib
 import pickle
-import io
+import os
+import tempfile
+import time
 import logging
-from typing import Optional
-from config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION, S3_BUCKET_NAME, S3_MODEL_KEY
+import numpy as np
+from botocore.config import Config
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+from config import (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION, S3_BUCKET_NAME, S3_MODEL_KEY,
+                    S3_ENDPOINT_URL, S3_DOWNLOAD_CONCURRENCY, S3_PART_SIZE, S3_MULTIPART_THRESHOLD,
+                    PREDICTION_CACHE_SIZE)
+from feature_schema import FEATURE_SCHEMA
+from workers import PoolSaturated, predict_pool
 
 logger = logging.getLogger(__name__)
 
+# Los envoltorios sklearn (XGBClassifier, ...) no aceptan DMatrix en predict: se usa su Booster
+def as_booster(model):
+    """The underlying Booster of an sklearn XGBoost wrapper, or ``model`` itself"""
+    return model.get_booster() if hasattr(model, 'get_booster') else model
+
+# Obtiene los nombres de características que el modelo conoce (si los guarda)
+def model_feature_names(model) -> Optional[Sequence[str]]:
+    """Feature names stored in a Booster or sklearn estimator"""
+    names = getattr(model, 'feature_names', None)
+    if names is None:
+        names = getattr(model, 'feature_names_in_', None)
+    return list(names) if names is not None else None
+
+# Número de características que espera el modelo, si se puede averiguar
+def model_num_features(model) -> Optional[int]:
+    if hasattr(model, 'num_features'):
+        return model.num_features()
+    return getattr(model, 'n_features_in_', None)
+
+# Etapa de CPU: predicción XGBoost y contribuciones SHAP (se ejecuta en el pool de workers)
+def run_model(model, features_array: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Predictions, confidences and SHAP contributions for every row of ``features_array``.
+
+    ``model`` must accept a DMatrix (a Booster, see ``as_booster``).
+
+    Contributions come from XGBoost's native TreeSHAP (``pred_contribs``) on
+    the same DMatrix, one column per feature plus the bias as the last column.
+    """
+    import xgboost as xgb
+
+    dmatrix = xgb.DMatrix(features_array, feature_names=list(FEATURE_SCHEMA.names))
+    predictions = np.asarray(model.predict(dmatrix), dtype=np.float64).reshape(len(features_array), -1)[:, 0]
+    
+    # Get prediction probability if available
+    try:
+        confidences = np.asarray(model.predict_proba(dmatrix), dtype=np.float64).max(axis=1)
+    except:
+        # For regression models, estimate confidence based on prediction value
+        confidences = np.clip(np.abs(predictions) / 10, 0.1, 0.95)
+
+    contributions = np.asarray(model.predict(dmatrix, pred_contribs=True), dtype=np.float64)
+    if contributions.ndim == 3:
+        # Multiclase: (filas, clases, features + 1); se explica la última clase
+        contributions = contributions[:, -1]
+    return predictions, confidences, contributions
+
+# Agrupa las contribuciones de una fila en factores: peso relativo y aporte con signo
+def factor_attribution(contributions: np.ndarray) -> Tuple[Dict[str, float], Dict[str, float]]:
+    grouped = FEATURE_SCHEMA.group_contributions(contributions[np.newaxis, :-1])[0]
+    total = np.abs(grouped).sum()
+    shares = np.abs(grouped) / total if total > 0 else np.zeros_like(grouped)
+    factors = {name: round(float(share), 4) for name, share in zip(FEATURE_SCHEMA.factors, shares)}
+    signed = {name: round(float(value), 6) for name, value in zip(FEATURE_SCHEMA.factors, grouped)}
+    signed['bias'] = round(float(contributions[-1]), 6)
+    return factors, signed
+
 class ModelService:
     def __init__(self):
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=AWS_ACCESS_KEY_ID,
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_DEFAULT_REGION
+            region_name=AWS_DEFAULT_REGION,
+            endpoint_url=S3_ENDPOINT_URL,
+            config=Config(
+                max_pool_connections=max(10, S3_DOWNLOAD_CONCURRENCY),
+                retries={'max_attempts': 5, 'mode': 'adaptive'},
+                tcp_keepalive=True,
+                connect_timeout=5,
+                read_timeout=30
+            )
         )
         self.model = None
         self.model_loaded = False
+        self.model_version = None
+        self.download_stats: Dict = {}
+        # (VersionId, ETag) del último objeto rechazado por el esquema: no se vuelve a descargar
+        self.rejected_version: Optional[Tuple[Optional[str], str]] = None
+        self.rejected_reason: Optional[str] = None
+        # (versión del modelo, vela) -> (bytes de las features, resultado con factores SHAP)
+        self.predictions: OrderedDict = OrderedDict()
+        self.prediction_cache_hits = 0
+        self.prediction_cache_misses = 0
+
+    # Descarga un rango de bytes del objeto y lo escribe en su posición del fichero
+    def _download_range(self, path: str, etag: str, start: int, end: int):
+        response = self.s3_client.get_object(
+            Bucket=S3_BUCKET_NAME, Key=S3_MODEL_KEY, Range=f"bytes={start}-{end}", IfMatch=etag
+        )
+        with open(path, 'r+b') as handle:
+            handle.seek(start)
+            for chunk in response['Body'].iter_chunks(1024 * 1024):
+                handle.write(chunk)
+
+    # Descarga el modelo de S3 a un fichero temporal
+    def _download_model(self, path: str, head: Dict) -> Dict:
+        """Stream the object described by ``head`` to ``path``, using parallel ranged GETs for large objects"""
+        size = head['ContentLength']
+        etag = head['ETag']
+        start_time = time.perf_counter()
+
+        if size <= S3_MULTIPART_THRESHOLD:
+            # Objetos pequeños: un único GET en streaming
+            if size:
+                self._download_range(path, etag, 0, size - 1)
+            parts = 1
+        else:
+            with open(path, 'r+b') as handle:
+                handle.truncate(size)
+            ranges = [(offset, min(offset + S3_PART_SIZE, size) - 1) for offset in range(0, size, S3_PART_SIZE)]
+            parts = len(ranges)
+            with ThreadPoolExecutor(max_workers=S3_DOWNLOAD_CONCURRENCY) as pool:
+                futures = [pool.submit(self._download_range, path, etag, start, end) for start, end in ranges]
+                for future in futures:
+                    future.result()
+
+        elapsed = time.perf_counter() - start_time
+        stats = {
+            'bytes': size,
+            'parts': parts,
+            'seconds': round(elapsed, 3),
+            'mbPerSecond': round(size / elapsed / 1e6, 2) if elapsed > 0 else None,
+            'versionId': head.get('VersionId'),
+            'etag': etag.strip('"')
+        }
+        logger.info(f"Downloaded {size} bytes in {parts} part(s), {elapsed:.2f}s ({stats['mbPerSecond']} MB/s)")
+        return stats
 
     # Carga el modelo XGBoost desde S3
     async def load_model(self) -> bool:
@@ -26,23 +154,34 @@ class ModelService:
             if self.model_loaded:
                 return True
 
+            # A schema mismatch is deterministic: skip the download until the object changes
+            head = await asyncio.to_thread(self.s3_client.head_object, Bucket=S3_BUCKET_NAME, Key=S3_MODEL_KEY)
+            version = (head.get('VersionId'), head['ETag'])
+            if version == self.rejected_version:
+                logger.debug(f"Model object {version} was already rejected: {self.rejected_reason}")
+                return False
+
             logger.info(f"Loading model from S3: {S3_BUCKET_NAME}/{S3_MODEL_KEY}")
             
-            # Download model from S3
-            response = self.s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=S3_MODEL_KEY)
-            model_data = response['Body'].read()
+            # Download model from S3 straight to disk (no in-memory copies)
+            handle = tempfile.NamedTemporaryFile(suffix='.model', delete=False)
+            handle.close()
+            try:
+                stats = await asyncio.to_thread(self._download_model, handle.name, head)
+                model = as_booster(await asyncio.to_thread(self._deserialize, handle.name))
+            finally:
+                os.unlink(handle.name)
             
-            # Try to load with joblib first (common for scikit-learn/XGBoost)
+            # Validate the feature layout once, before any prediction
             try:
-                model_io = io.BytesIO(model_data)
-                self.model = joblib.load(model_io)
-                logger.info("Model loaded successfully with joblib")
-            except Exception as joblib_error:
-                logger.info(f"Joblib loading failed: {joblib_error}, trying pickle...")
-                # Fallback to pickle
-                self.model = pickle.loads(model_data)
-                logger.info("Model loaded successfully with pickle")
+                FEATURE_SCHEMA.validate(model_feature_names(model), model_num_features(model))
+            except ValueError as e:
+                self.rejected_version, self.rejected_reason = version, str(e)
+                raise
             
+            self.model = model
+            self.model_version = stats['versionId'] or stats['etag'] or S3_MODEL_KEY
+            self.download_stats = stats
             self.model_loaded = True
             return True
             
@@ -50,72 +189,83 @@ class ModelService:
             logger.error(f"Error loading model from S3: {str(e)}")
             return False
 
+    # Deserializa el modelo desde el fichero descargado
+    def _deserialize(self, path: str):
+        # Try to load with joblib first (common for scikit-learn/XGBoost)
+        try:
+            model = joblib.load(path)
+            logger.info("Model loaded successfully with joblib")
+        except Exception as joblib_error:
+            logger.info(f"Joblib loading failed: {joblib_error}, trying pickle...")
+            # Fallback to pickle
+            with open(path, 'rb') as handle:
+                model = pickle.load(handle)
+            logger.info("Model loaded successfully with pickle")
+        return model
+
     # Realiza una predicción usando el modelo cargado
-    async def predict(self, features: list) -> Optional[dict]:
-        """Make prediction using the loaded model"""
+    async def predict(self, features: list, bar_ts: Optional[int] = None) -> Optional[dict]:
+        """Make prediction using the loaded model.
+
+        With ``bar_ts`` the result, including its SHAP factor attribution, is
+        cached per model version and bar and reused while the features match.
+        """
         try:
             if not self.model_loaded:
                 success = await self.load_model()
                 if not success:
                     return None
 
-            # Make prediction
-            import numpy as np
-            import xgboost as xgb
-            import pandas as pd
-            
-            logger.info(f"Received {len(features)} features for prediction.")
-            logger.debug(f"Feature values (first 20): {features[:20]}")
-            
-            # Reorder features according to the expected training order
-            expected_order = [12, 10, 2, 14, 19, 17, 1, 5, 9, 11, 18, 16, 8, 3, 15, 4, 7, 13, 6]
-            
-            logger.info(f"Expected feature order (1-based): {expected_order}")
+            # Features arrive already in FEATURE_SCHEMA order
+            features_array = np.asarray(features, dtype=np.float32).reshape(1, -1)
+            if features_array.shape[1] != len(FEATURE_SCHEMA):
+                logger.error(f"Expected {len(FEATURE_SCHEMA)} features, received {features_array.shape[1]}")
+                return None
+            logger.debug(f"Feature values: {features_array[0].tolist()}")
 
-            # Convert from 1-based to 0-based indexing and reorder
-            reordered_features = []
-            # Pad features with a default value if it's shorter than the max index required
-            padded_features = features + [0.0] * (max(expected_order) - len(features))
+            # Reuse the result for this bar if the features have not changed
+            key = (self.model_version, bar_ts)
+            fingerprint = features_array.tobytes()
+            if bar_ts is not None:
+                cached = self.predictions.get(key)
+                if cached is not None and cached[0] == fingerprint:
+                    self.prediction_cache_hits += 1
+                    self.predictions.move_to_end(key)
+                    return cached[1]
+                self.prediction_cache_misses += 1
 
-            for idx in expected_order:
-                reordered_features.append(padded_features[idx-1]) # Convert to 0-based index
-            
-            logger.info(f"Reordered {len(reordered_features)} features.")
-            logger.debug(f"Reordered feature values: {reordered_features}")
+            # Prediction and SHAP contributions in one call on the predict stage's workers
+            predictions, confidences, contributions = await predict_pool.run(run_model, self.model, features_array)
+            logger.info(f"Raw prediction from model: {predictions[0]}")
+            factors, contributions_by_factor = factor_attribution(contributions[0])
 
-            # Create column names as strings as expected by the model
-            column_names = [str(i) for i in range(1, len(reordered_features) + 1)]
-            
-            # Convert to DataFrame with correct column names
-            features_array = np.array(reordered_features).reshape(1, -1)
-            dframe = pd.DataFrame(features_array, columns=column_names)
+            result = {
+                'prediction': float(predictions[0]),
+                'confidence': float(confidences[0]),
+                'factors': factors,
+                'factorContributions': contributions_by_factor
+            }
             
-            logger.info("Feature DataFrame created successfully. Columns:")
-            logger.debug(dframe.columns.tolist())
-            logger.debug("DataFrame content:")
-            logger.debug(dframe.to_string())
-
-            dmatrix = xgb.DMatrix(dframe)
+            if bar_ts is not None:
+                self.predictions[key] = (fingerprint, result)
+                self.predictions.move_to_end(key)
+                while len(self.predictions) > PREDICTION_CACHE_SIZE:
+                    self.predictions.popitem(last=False)
             
-            prediction = self.model.predict(dmatrix)[0]
-            logger.info(f"Raw prediction from model: {prediction}")
-            
-            # Get prediction probability if available
-            try:
-                probabilities = self.model.predict_proba(dmatrix)[0]
-                confidence = max(probabilities)
-            except:
-                # For regression models, estimate confidence based on prediction value
-                confidence = min(0.95, max(0.1, abs(prediction) / 10))
-
-            return {
-                'prediction': float(prediction),
-                'confidence': float(confidence)
-            }
+            return result
             
+        except PoolSaturated:
+            raise
         except Exception as e:
             logger.error(f"Error making prediction: {str(e)}")
             return None
 
+    def cache_stats(self) -> Dict:
+        return {
+            'size': len(self.predictions),
+            'hits': self.prediction_cache_hits,
+            'misses': self.prediction_cache_misses
+        }
+
 # Global model service instance
 model_service = ModelService()
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from config import (NEWS_LOOKBACK_DAYS, NEWS_MAX_PAGES, NEWS_PAGE_LIMIT, NEWS_REFRESH_INTERVAL,
+                    NEWS_RETRY_INTERVAL, NEWS_TICKER, POLYGON_API_KEY, POLYGON_BASE_URL, UPSTREAM_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+# Léxico financiero para artículos sin "insights" de Polygon
+_LEXICON = {
+    'beat': 1.0, 'beats': 1.0, 'bull': 1.0, 'bullish': 1.0, 'gain': 0.8, 'gains': 0.8,
+    'growth': 0.7, 'high': 0.4, 'higher': 0.6, 'optimism': 0.8, 'optimistic': 0.8,
+    'outperform': 0.9, 'rally': 1.0, 'rallies': 1.0, 'rebound': 0.8, 'record': 0.6,
+    'rise': 0.7, 'rises': 0.7, 'soar': 1.0, 'soars': 1.0, 'strong': 0.7, 'surge': 1.0,
+    'surges': 1.0, 'upgrade': 0.9, 'upbeat': 0.8,
+    'bear': -1.0, 'bearish': -1.0, 'crash': -1.0, 'cut': -0.5, 'decline': -0.7,
+    'declines': -0.7, 'downgrade': -0.9, 'drop': -0.7, 'drops': -0.7, 'fall': -0.7,
+    'falls': -0.7, 'fear': -0.8, 'fears': -0.8, 'loss': -0.8, 'losses': -0.8, 'lower': -0.6,
+    'miss': -0.9, 'misses': -0.9, 'plunge': -1.0, 'plunges': -1.0, 'recession': -1.0,
+    'selloff': -1.0, 'slump': -0.9, 'tumble': -1.0, 'tumbles': -1.0, 'weak': -0.7,
+}
+_VOCAB = np.array(sorted(_LEXICON))
+_WEIGHTS = np.array([_LEXICON[word] for word in _VOCAB], dtype=np.float64)
+
+_INSIGHT_SCORES = {'positive': 1.0, 'negative': -1.0, 'neutral': 0.0}
+
+
+# Devuelve la etiqueta de sentimiento a partir del score
+def sentiment_label(score: float) -> str:
+    if score > 0.1:
+        return 'positive'
+    if score < -0.1:
+        return 'negative'
+    return 'neutral'
+
+
+# Puntúa un lote de artículos de una sola vez
+def score_articles(articles: List[Dict], ticker: str = NEWS_TICKER) -> np.ndarray:
+    """Sentiment in [-1, 1] for each article, computed as one vectorized batch.
+
+    Polygon's per-ticker insight is used when present; otherwise the score is
+    the mean lexicon weight of the matched words in title and description.
+    """
+    n = len(articles)
+    if n == 0:
+        return np.zeros(0)
+
+    insight = np.full(n, np.nan)
+    token_lists = []
+    for i, article in enumerate(articles):
+        for item in article.get('insights') or []:
+            if item.get('ticker') == ticker:
+                insight[i] = _INSIGHT_SCORES.get(item.get('sentiment'), 0.0)
+                break
+        text = f"{article.get('title') or ''} {article.get('description') or ''}".lower()
+        token_lists.append(_TOKEN_RE.findall(text))
+
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=n)
+    tokens = np.array([token for tokens in token_lists for token in tokens], dtype=str)
+    owner = np.repeat(np.arange(n), lengths)
+
+    # Búsqueda vectorizada en el léxico ordenado
+    pos = np.searchsorted(_VOCAB, tokens).clip(0, len(_VOCAB) - 1)
+    hit = _VOCAB[pos] == tokens
+    weights = np.where(hit, _WEIGHTS[pos], 0.0)
+    totals = np.bincount(owner, weights=weights, minlength=n)
+    hits = np.bincount(owner, weights=hit.astype(np.float64), minlength=n)
+    lexicon = totals / np.maximum(hits, 1.0)
+
+    return np.where(np.isnan(insight), lexicon, insight)
+
+
+class NewsService:
+    """Fetches ticker news from Polygon once per interval and serves the aggregate.
+
+    Every client reads the same cached, deduplicated article set, so upstream
+    traffic depends only on ``NEWS_REFRESH_INTERVAL``, not on the number of
+    visitors. One pooled keep-alive HTTP client is reused for every refresh.
+    After a failed refresh the upstream is retried every ``NEWS_RETRY_INTERVAL``
+    seconds and the cached aggregate is flagged ``stale``.
+    """
+
+    def __init__(self, base_url: str = POLYGON_BASE_URL, api_key: Optional[str] = POLYGON_API_KEY,
+                 ticker: str = NEWS_TICKER, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.ticker = ticker
+        self.transport = transport
+        self.client: Optional[httpx.AsyncClient] = None
+        self.lock = asyncio.Lock()
+        self.articles: Dict[str, Dict] = {}
+        self.last_refresh: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.refresh_failed = False
+        self.aggregates: Dict[Tuple[int, int], Dict] = {}
+        self.upstream_calls = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(UPSTREAM_TIMEOUT),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=120.0),
+                # La clave va en la cabecera para que no aparezca en los logs de URLs
+                headers={'Accept-Encoding': 'gzip', 'Authorization': f"Bearer {self.api_key}"},
+                transport=self.transport
+            )
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    # Descarga las noticias nuevas desde la última actualización
+    async def _refresh(self):
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=NEWS_LOOKBACK_DAYS)
+        newest = max((a['_published'] for a in self.articles.values()), default=cutoff)
+
+        # Se siguen las páginas (next_url) hasta cubrir la ventana, como mucho NEWS_MAX_PAGES
+        results = []
+        url, params = '/v2/reference/news', {
+            'ticker': self.ticker,
+            'published_utc.gte': newest.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'order': 'desc',
+            'limit': NEWS_PAGE_LIMIT
+        }
+        for _ in range(NEWS_MAX_PAGES):
+            self.upstream_calls += 1
+            response = await self._client().get(url, params=params)
+            response.raise_for_status()
+            payload = response.json()
+            results.extend(payload.get('results') or [])
+            url, params = payload.get('next_url'), None
+            if not url:
+                break
+        else:
+            logger.warning(f"News refresh stopped after {NEWS_MAX_PAGES} pages; older articles are missing")
+
+        # Deduplicar por id y puntuar todos los artículos nuevos en un lote
+        fresh = [a for a in results if a.get('id') and a['id'] not in self.articles]
+        scores = score_articles(fresh, self.ticker)
+        for article, score in zip(fresh, scores.tolist()):
+            article['_score'] = score
+            article['_published'] = datetime.fromisoformat(article['published_utc'].replace('Z', '+00:00'))
+            self.articles[article['id']] = article
+
+        # Olvidar artículos fuera de la ventana
+        self.articles = {k: a for k, a in self.articles.items() if a['_published'] >= cutoff}
+        self.aggregates.clear()
+        logger.info(f"News refresh: {len(fresh)} new articles, {len(self.articles)} cached")
+
+    # Intervalo hasta el siguiente refresco: más corto si el último falló
+    def _is_fresh(self) -> bool:
+        if self.last_refresh is None:
+            return False
+        interval = min(NEWS_RETRY_INTERVAL, NEWS_REFRESH_INTERVAL) if self.refresh_failed else NEWS_REFRESH_INTERVAL
+        return time.monotonic() - self.last_refresh < interval
+
+    async def _ensure_fresh(self):
+        if self._is_fresh():
+            return
+        async with self.lock:
+            # Otra petición pudo refrescar mientras esperábamos el lock
+            if self._is_fresh():
+                return
+            try:
+                await self._refresh()
+                self.refresh_failed = False
+                self.last_success = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error fetching news from Polygon: {str(e)}")
+                self.refresh_failed = True
+                self.aggregates.clear()
+            # También tras un fallo: el upstream se consulta como mucho una vez por intervalo de reintento
+            self.last_refresh = time.monotonic()
+
+    # Obtiene el sentimiento agregado y las noticias más relevantes
+    async def get_sentiment(self, days_back: int = 7, limit: int = 10) -> Optional[Dict]:
+        """Aggregated sentiment and top articles over the last ``days_back`` days.
+
+        ``days_back`` is capped at ``NEWS_LOOKBACK_DAYS``, the window kept in
+        memory. Returns None when the key is missing or no refresh has
+        succeeded yet.
+        """
+        if not self.api_key:
+            logger.error("POLYGON_API_KEY not configured")
+            return None
+
+        await self._ensure_fresh()
+        if self.last_success is None:
+            return None
+        key = (min(days_back, NEWS_LOOKBACK_DAYS), limit)
+        if key not in self.aggregates:
+            self.aggregates[key] = self._aggregate(*key)
+        return self.aggregates[key]
+
+    def _aggregate(self, days_back: int, limit: int) -> Dict:
+        since = datetime.now(timezone.utc) - timedelta(days=days_back)
+        articles = sorted((a for a in self.articles.values() if a['_published'] >= since),
+                          key=lambda a: a['_published'], reverse=True)
+        scores = np.array([a['_score'] for a in articles], dtype=np.float64)
+        avg = float(scores.mean()) if len(scores) else 0.0
+
+        return {
+            'stale': self.refresh_failed,
+            'days': days_back,
+            'sentiment': {
+                'score': avg,
+                'label': sentiment_label(avg),
+                'confidence': min(len(scores) / 20, 1.0),
+                'articlesAnalyzed': len(scores),
+                'lastUpdated': datetime.now(timezone.utc).isoformat(),
+                'breakdown': {
+                    'positive': int((scores > 0.1).sum()),
+                    'negative': int((scores < -0.1).sum()),
+                    'neutral': int(((scores >= -0.1) & (scores <= 0.1)).sum())
+                }
+            },
+            'articles': [
+                {
+                    'id': a['id'],
+                    'title': a.get('title', ''),
+                    'description': a.get('description') or '',
+                    'url': a.get('article_url', ''),
+                    'publishedAt': a['published_utc'],
+                    'source': (a.get('publisher') or {}).get('name', ''),
+                    'sentiment': {'score': a['_score'], 'label': sentiment_label(a['_score'])},
+                    'influence': 1,
+                    'keywords': a.get('keywords') or []
+                }
+                for a in articles[:limit]
+            ]
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'articlesCached': len(self.articles),
+            'upstreamCalls': self.upstream_calls,
+            'refreshFailed': self.refresh_failed,
+            'refreshInterval': NEWS_REFRESH_INTERVAL
+        }
+
+# Global news service instance
+news_service = NewsService()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open"""
+
+
+class Deadline:
+    """Latency budget for one request, measured on the monotonic clock"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around a flaky upstream.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds; then a single trial call is
+    let through (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.counters = {'calls': 0, 'successes': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.counters['successes'] += 1
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed")
+        self.state = self.CLOSED
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.counters['failures'] += 1
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} failures")
+                self.counters['opened'] += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    # Ejecuta una llamada bloqueante en un hilo, limitada por un timeout
+    async def call(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """Run a blocking upstream call under the breaker and a deadline.
+
+        The awaiting coroutine is cancelled when ``timeout`` expires; the worker
+        thread itself cannot be interrupted, so ``func`` should also receive its
+        own network timeout.
+        """
+        if not self.allow():
+            self.counters['rejected'] += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        if timeout is not None and timeout <= 0:
+            self.counters['rejected'] += 1
+            self.trial_in_flight = False
+            raise asyncio.TimeoutError(f"No time left for '{self.name}' call")
+
+        trial = self.state == self.HALF_OPEN
+        self.counters['calls'] += 1
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelada (cliente desconectado, apagado): libera la llamada de prueba sin contar fallo
+            if trial and self.state == self.HALF_OPEN:
+                self.trial_in_flight = False
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            'state': self.state,
+            'consecutiveFailures': self.consecutive_failures,
+            'failureThreshold': self.failure_threshold,
+            'resetTimeout': self.reset_timeout,
+            **self.counters
+        }
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los módulos del backend se importan como módulos de nivel superior (igual que en main.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _ohlcv_frame(rows: int, start: float = 5000.0, step: float = 1.0, volume: float = 3e9,
+                 end: str = '2025-03-07') -> pd.DataFrame:
+    """Daily bars with a linear 2-decimal close and distinct volumes, ending at ``end``"""
+    index = pd.bdate_range(end=end, periods=rows, tz='America/New_York')
+    close = np.round(start + np.arange(rows) * step, 2)
+    return pd.DataFrame({'Open': close - 1.25, 'High': close + 2.5, 'Low': close - 2.75, 'Close': close,
+                         'Volume': volume + np.arange(rows, dtype=np.float64)}, index=index)
+
+
+@pytest.fixture
+def ohlcv_frame():
+    """Factory for synthetic OHLCV DataFrames (see ``_ohlcv_frame``)"""
+    return _ohlcv_frame
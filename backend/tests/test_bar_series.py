@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from bar_series import json_float, json_floats
+from downsampling import chart_series
+from indicators import IndicatorFrame
+
+
+@pytest.fixture
+def frame(ohlcv_frame):
+    return ohlcv_frame(60, start=5000.38, step=12.37, volume=4_123_456_789)
+
+
+def test_volume_stays_exact_through_slices_and_resampling(frame):
+    series = IndicatorFrame.from_ohlcv(frame)
+    expected = frame['Volume'].to_numpy()
+    assert series['Volume'][-1] == 4_123_456_848
+    assert series.latest('Volume') == 4_123_456_848
+    assert np.array_equal(series.tail(10)['Volume'], expected[-10:])
+    assert np.array_equal(series.take(np.array([0, 5]))['Volume'], expected[[0, 5]])
+    weekly = chart_series(series, 'weekly')
+    assert weekly['Volume'].sum() == expected.sum()
+    assert series.to_dataframe(['Volume'])['Volume'].equals(frame['Volume'])
+
+
+def test_json_floats_drop_float32_noise(frame):
+    series = IndicatorFrame.from_ohlcv(frame)
+    assert float(series['Close'][0]) != 5000.38
+    assert json_floats(series['Close'][:2]) == [5000.38, 5012.75]
+    assert json_float(series.latest('Close')) == 5730.21
+    assert json_float(None) is None
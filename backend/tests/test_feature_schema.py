@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from bar_series import BarSeries
+from feature_schema import FEATURE_SCHEMA
+
+# Vector de características anterior al esquema (market_service.get_features_for_prediction)
+LEGACY_FEATURES = [
+    'Close', 'rsi', 'macd', 'macd_signal', 'sma_10', 'sma_20', 'sma_50', 'sma_100', 'sma_200',
+    'bb_upper', 'bb_middle', 'bb_lower', 'bb_width', 'adx', 'obv', 'ret_1d', 'ret_5d', 'vol_20', 'Volume',
+    'bb_position', 'distance_to_sma_20', 'distance_to_sma_50',
+]
+# Orden de entrenamiento (1-based sobre LEGACY_FEATURES) que aplicaba model_service.predict
+LEGACY_EXPECTED_ORDER = [12, 10, 2, 14, 19, 17, 1, 5, 9, 11, 18, 16, 8, 3, 15, 4, 7, 13, 6]
+
+
+def test_schema_matches_legacy_training_order():
+    assert FEATURE_SCHEMA.names == tuple(str(i) for i in range(1, len(LEGACY_EXPECTED_ORDER) + 1))
+    assert [f.column for f in FEATURE_SCHEMA.features] == [LEGACY_FEATURES[i - 1] for i in LEGACY_EXPECTED_ORDER]
+
+
+@pytest.fixture
+def series():
+    columns = ('pad',) + FEATURE_SCHEMA.source_columns[::-1]
+    # Valor = 100 * fila de la columna + fila de la barra, para reconocer cada celda
+    values = np.add.outer(np.arange(len(columns)) * 100.0, np.arange(6.0))
+    return BarSeries(np.arange(6), values, columns)
+
+
+def expected(series, rows):
+    return np.stack([series[f.column][rows] for f in FEATURE_SCHEMA.features], axis=-1)
+
+
+def test_gather_int_row(series):
+    compiled = FEATURE_SCHEMA.compile(series.columns)
+    matrix = compiled.gather(series, -1)
+    assert matrix.shape == (1, len(FEATURE_SCHEMA))
+    np.testing.assert_array_equal(matrix[0], expected(series, -1))
+    np.testing.assert_array_equal(compiled.gather(series, np.int64(2))[0], expected(series, 2))
+
+
+def test_gather_slice_and_array_rows(series):
+    compiled = FEATURE_SCHEMA.compile(series.columns)
+    np.testing.assert_array_equal(compiled.gather(series, slice(1, 4)), expected(series, slice(1, 4)))
+    rows = np.array([5, 0, 3])
+    np.testing.assert_array_equal(compiled.gather(series, rows), expected(series, rows))
+
+
+def test_gather_replaces_nan_with_zero(series):
+    series.values[series.column_index['rsi'], -1] = np.nan
+    matrix = FEATURE_SCHEMA.compile(series.columns).gather(series)
+    assert matrix[0, FEATURE_SCHEMA.names.index('3')] == 0.0
+
+
+def test_validate_rejects_other_names():
+    FEATURE_SCHEMA.validate(list(FEATURE_SCHEMA.names))
+    with pytest.raises(ValueError):
+        FEATURE_SCHEMA.validate(list(FEATURE_SCHEMA.names[::-1]))
+    with pytest.raises(ValueError):
+        FEATURE_SCHEMA.validate(None, len(FEATURE_SCHEMA) + 1)
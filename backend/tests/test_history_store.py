@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pytest
+
+from history_store import PredictionHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PredictionHistoryStore(str(tmp_path / 'history.db'), batch_size=2, flush_interval=30.0)
+    yield store
+    store.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_store_is_created_lazily(tmp_path):
+    path = tmp_path / 'lazy.db'
+    store = PredictionHistoryStore(str(path))
+    assert not path.exists()
+    assert store.query() == []
+    assert path.exists()
+
+
+def test_writer_flushes_full_batches_and_remaining_rows_on_close(store):
+    store.record(100, 'v1', 0.6, 0.7, [1.0, 2.0])
+    store.record(200, 'v1', 0.4, 0.8, [3.0, 4.0])
+    # Lote lleno: se escribe sin esperar a flush_interval
+    assert wait_for(lambda: store.rows_written == 2)
+
+    store.record(300, 'v1', 0.5, 0.9, [5.0, 6.0])
+    time.sleep(0.2)
+    assert store.rows_written == 2
+    store.close()
+    assert store.rows_written == 3
+    assert [row['barTimestamp'] for row in store.query()] == [100, 200, 300]
+
+
+def test_repeats_served_from_cache_are_recorded_once(store):
+    store.record(100, 'v1', 0.6, 0.7, [1.0])
+    store.record(100, 'v1', 0.6, 0.7, [1.0])
+    store.record(100, 'v2', 0.6, 0.7, [1.0])
+    store.record(100, 'v1', 0.65, 0.7, [1.0])
+    store.close()
+    rows = store.query()
+    assert [(row['modelVersion'], row['prediction']) for row in rows] == [('v1', 0.6), ('v2', 0.6), ('v1', 0.65)]
+
+
+def test_range_query(store):
+    for bar_ts in (300, 100, 400, 200):
+        store.record(bar_ts, 'v1', bar_ts / 1000, 0.5, np.arange(3) + bar_ts, target_price=5000.0, direction='up')
+    store.record(250, 'v2', 0.25, 0.5, [0.0])
+    store.close()
+
+    rows = store.query(start=200, end=300)
+    assert [row['barTimestamp'] for row in rows] == [200, 250, 300]
+    assert [row['barTimestamp'] for row in store.query(start=200, end=300, model_version='v1')] == [200, 300]
+    assert [row['barTimestamp'] for row in store.query(model_version='v1', limit=2)] == [100, 200]
+    assert store.query(start=500) == []
+
+    row = rows[0]
+    assert row['features'] == [200.0, 201.0, 202.0]
+    assert row['targetPrice'] == 5000.0 and row['direction'] == 'up' and row['modelVersion'] == 'v1'
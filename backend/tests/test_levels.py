@@ -0,0 +1,59 @@
+import numpy as np
+
+from levels import cluster_levels, find_pivots, support_resistance
+
+
+def zigzag(peaks, troughs, leg=6):
+    """Close path alternating between the given peaks and troughs"""
+    points = [v for pair in zip(troughs, peaks) for v in pair]
+    return np.concatenate([np.linspace(a, b, leg, endpoint=False) for a, b in zip(points, points[1:])]
+                          + [[points[-1]]])
+
+
+def test_find_pivots_skips_edges():
+    high = np.array([1, 2, 3, 9, 3, 2, 1, 2, 3, 4, 5, 6, 7], dtype=float)
+    low = high - 1
+    low[7:] = [-1, 1, 2, 3, 4, 5]
+    pivot_high, pivot_low = find_pivots(high, low, window=2)
+    assert pivot_high.tolist() == [3]
+    assert pivot_low.tolist() == [7]
+    # La barra 3 no tiene 5 barras a cada lado
+    assert find_pivots(high, low, window=5)[0].tolist() == []
+
+
+def test_cluster_levels_groups_close_prices():
+    # 99.3, 99.8 y 99.6 caen en el mismo tramo logarítmico del 1%
+    prices = np.array([99.3, 99.8, 99.6, 110.0])
+    volumes = np.array([1.0, 3.0, 0.0, 2.0])
+    levels = cluster_levels(prices, volumes, tolerance=0.01)
+    assert levels['touches'].tolist() == [3.0, 1.0]
+    assert levels['volume'].tolist() == [4.0, 2.0]
+    # Precio ponderado por volumen (volumen 0 cuenta como 1)
+    np.testing.assert_allclose(levels['price'][0], (99.3 + 99.8 * 3 + 99.6) / 5)
+    assert len(cluster_levels(np.zeros(0), np.zeros(0))['price']) == 0
+
+
+def test_split_around_last_close():
+    close = zigzag(peaks=[110, 120, 110, 120, 110], troughs=[100, 90, 100, 90, 100])
+    close = np.concatenate((close, np.linspace(100, 105, 6)))
+    result = support_resistance(close + 0.5, close - 0.5, close, np.ones(len(close)),
+                                window=3, atr_band=1000)
+    assert result['support'] and result['resistance']
+    assert all(price < close[-1] for price in result['support'])
+    assert all(price >= close[-1] for price in result['resistance'])
+    # Más cercano primero
+    assert result['support'] == sorted(result['support'], reverse=True)
+    assert result['resistance'] == sorted(result['resistance'])
+
+
+def test_levels_far_from_price_are_ignored():
+    # Mínimos muy tocados en 50 al principio; el precio sube luego a ~200 y oscila en torno a 190-210
+    early = zigzag(peaks=[60, 60, 60, 60], troughs=[50, 50, 50, 50])
+    late = zigzag(peaks=[210, 210], troughs=[190, 190])
+    close = np.concatenate((early, np.linspace(early[-1], 190, 40), late, np.linspace(190, 200, 6)))
+    result = support_resistance(close + 0.5, close - 0.5, close, np.ones(len(close)), window=3)
+    assert result['support'] and min(result['support']) > 150
+    assert all(level['price'] > 150 for level in result['levels'])
+
+    wide = support_resistance(close + 0.5, close - 0.5, close, np.ones(len(close)), window=3, atr_band=1000)
+    assert min(wide['support']) < 60
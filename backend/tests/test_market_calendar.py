@@ -0,0 +1,88 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from market_calendar import cache_expiry, early_closes, holidays, is_open, next_open, session
+
+D = dt.date
+
+# Calendarios oficiales publicados por la NYSE
+NYSE_HOLIDAYS = {
+    2024: {D(2024, 1, 1), D(2024, 1, 15), D(2024, 2, 19), D(2024, 3, 29), D(2024, 5, 27), D(2024, 6, 19),
+           D(2024, 7, 4), D(2024, 9, 2), D(2024, 11, 28), D(2024, 12, 25)},
+    2025: {D(2025, 1, 1), D(2025, 1, 9), D(2025, 1, 20), D(2025, 2, 17), D(2025, 4, 18), D(2025, 5, 26),
+           D(2025, 6, 19), D(2025, 7, 4), D(2025, 9, 1), D(2025, 11, 27), D(2025, 12, 25)},
+    2026: {D(2026, 1, 1), D(2026, 1, 19), D(2026, 2, 16), D(2026, 4, 3), D(2026, 5, 25), D(2026, 6, 19),
+           D(2026, 7, 3), D(2026, 9, 7), D(2026, 11, 26), D(2026, 12, 25)},
+    2027: {D(2027, 1, 1), D(2027, 1, 18), D(2027, 2, 15), D(2027, 3, 26), D(2027, 5, 31), D(2027, 6, 18),
+           D(2027, 7, 5), D(2027, 9, 6), D(2027, 11, 25), D(2027, 12, 24)},
+}
+NYSE_EARLY_CLOSES = {
+    2024: {D(2024, 7, 3), D(2024, 11, 29), D(2024, 12, 24)},
+    2025: {D(2025, 7, 3), D(2025, 11, 28), D(2025, 12, 24)},
+    2026: {D(2026, 11, 27), D(2026, 12, 24)},
+}
+
+
+def et(*args):
+    return pd.Timestamp(dt.datetime(*args)).tz_localize('America/New_York').to_pydatetime()
+
+
+@pytest.mark.parametrize('year', sorted(NYSE_HOLIDAYS))
+def test_holidays_match_nyse(year):
+    assert holidays(year) == NYSE_HOLIDAYS[year]
+
+
+@pytest.mark.parametrize('year', sorted(NYSE_EARLY_CLOSES))
+def test_early_closes_match_nyse(year):
+    assert early_closes(year) == NYSE_EARLY_CLOSES[year]
+
+
+def test_observance_edge_cases():
+    # Año Nuevo en sábado (2022) no se observa el viernes anterior
+    assert D(2021, 12, 31) not in holidays(2021)
+    assert not any(day.month == 1 and day.day <= 3 for day in holidays(2022))
+    # Juneteenth solo desde 2022; en domingo se observa el lunes
+    assert D(2021, 6, 18) not in holidays(2021) and D(2021, 6, 19) not in holidays(2021)
+    assert D(2022, 6, 20) in holidays(2022)
+
+
+def test_session_hours():
+    open_, close = session(D(2025, 11, 28))
+    assert (open_.hour, open_.minute, close.hour) == (9, 30, 13)
+    assert session(D(2025, 3, 5))[1].hour == 16
+    assert session(D(2025, 3, 8)) is None
+    assert session(D(2025, 4, 18)) is None
+    assert is_open(et(2025, 3, 5, 15, 59)) and not is_open(et(2025, 3, 5, 16, 0))
+    assert next_open(et(2025, 3, 5, 9, 30)) == et(2025, 3, 6, 9, 30)
+
+
+def test_expiry_mid_session_is_next_boundary_from_open():
+    assert cache_expiry(et(2025, 3, 5, 10, 7), 300) == et(2025, 3, 5, 10, 10)
+    assert cache_expiry(et(2025, 3, 5, 10, 10), 300) == et(2025, 3, 5, 10, 15)
+
+
+def test_expiry_in_close_grace_window():
+    assert cache_expiry(et(2025, 3, 5, 16, 2), 300, grace=600) == et(2025, 3, 5, 16, 5)
+    # La frontera nunca pasa del final del margen
+    assert cache_expiry(et(2025, 3, 5, 15, 45), 3600, grace=600) == et(2025, 3, 5, 16, 10)
+    # Pasado el margen, hasta la siguiente apertura
+    assert cache_expiry(et(2025, 3, 5, 16, 10), 300, grace=600) == et(2025, 3, 6, 9, 30)
+    assert cache_expiry(et(2025, 3, 5, 16, 2), 300) == et(2025, 3, 6, 9, 30)
+
+
+def test_expiry_on_weekend_and_holiday():
+    # Sábado -> lunes
+    assert cache_expiry(et(2025, 3, 8, 12, 0), 300) == et(2025, 3, 10, 9, 30)
+    # Viernes Santo -> lunes
+    assert cache_expiry(et(2025, 4, 18, 11, 0), 300) == et(2025, 4, 21, 9, 30)
+    # Cierre anticipado del 3 de julio, festivo el 4 y fin de semana -> lunes 7
+    assert cache_expiry(et(2025, 7, 3, 14, 0), 300, grace=600) == et(2025, 7, 7, 9, 30)
+    # Antes de la apertura -> apertura del mismo día
+    assert cache_expiry(et(2025, 3, 5, 8, 0), 300) == et(2025, 3, 5, 9, 30)
+
+
+def test_expiry_accepts_utc_input():
+    now = dt.datetime(2025, 3, 5, 15, 7, tzinfo=dt.timezone.utc)  # 10:07 ET
+    assert cache_expiry(now, 300) == et(2025, 3, 5, 10, 10)
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from market_service import MarketDataService
+
+
+@pytest.fixture
+def service(monkeypatch, ohlcv_frame):
+    service = MarketDataService()
+    monkeypatch.setattr(service, '_download_history',
+                        lambda period, timeout: ohlcv_frame(21 if period == '1mo' else 260))
+    return service
+
+
+def test_short_period_serves_ohlcv_without_indicators(service):
+    series = asyncio.run(service.get_historical_series('1mo'))
+    assert series is not None and len(series) == 21
+    assert series.computed_columns() == ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def test_short_period_has_no_features(service):
+    assert asyncio.run(service.get_feature_matrix('1mo', -1)) is None
+
+
+def test_chart_memo_is_bounded_by_resolution(service):
+    series = asyncio.run(service.get_historical_series('1y'))
+    for points in range(3, 203):
+        assert len(service.get_chart_series(series, 'weekly', points)) <= points
+    service.get_chart_series(series, 'daily', 50)
+    assert set(series.attrs['resampled']) == {'weekly', 'daily'}
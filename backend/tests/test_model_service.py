@@ -0,0 +1,138 @@
+import asyncio
+import io
+
+import joblib
+import numpy as np
+import pytest
+
+from feature_schema import FEATURE_SCHEMA
+import model_service as model_module
+from model_service import ModelService, run_model
+
+
+def model_bytes(names=FEATURE_SCHEMA.names):
+    import xgboost as xgb
+
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(200, len(names)))
+    labels = (features[:, 0] > 0).astype(np.float32)
+    dtrain = xgb.DMatrix(features, label=labels, feature_names=list(names))
+    booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 2}, dtrain, num_boost_round=5)
+    buffer = io.BytesIO()
+    joblib.dump(booster, buffer)
+    return buffer.getvalue()
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size=1024):
+        for offset in range(0, len(self.data), chunk_size):
+            yield self.data[offset:offset + chunk_size]
+
+
+class StubS3:
+    """HEAD and ranged GETs over an in-memory object"""
+
+    def __init__(self, data, etag='"v1"'):
+        self.data = data
+        self.etag = etag
+        self.gets = []
+
+    def head_object(self, Bucket=None, Key=None):
+        return {'ContentLength': len(self.data), 'ETag': self.etag, 'VersionId': None}
+
+
+    def get_object(self, Bucket=None, Key=None, Range=None, IfMatch=None):
+        self.gets.append(Range)
+        if IfMatch != self.etag:
+            raise ValueError("PreconditionFailed")
+        start, end = (int(value) for value in Range.removeprefix('bytes=').split('-'))
+        return {'Body': _Body(self.data[start:end + 1])}
+
+
+class ChangedS3(StubS3):
+    """Object replaced between the HEAD and the ranged GETs"""
+
+    def head_object(self, Bucket=None, Key=None):
+        return {**super().head_object(), 'ETag': '"stale"'}
+
+
+@pytest.fixture
+def service():
+    service = ModelService()
+    service.s3_client = StubS3(model_bytes())
+    return service
+
+
+def test_loads_matching_model(service):
+    assert asyncio.run(service.load_model())
+    assert service.model_version == 'v1'
+    assert service.rejected_version is None
+
+
+def test_rejected_model_is_not_downloaded_again_until_it_changes(service):
+    service.s3_client = StubS3(model_bytes(names=[f"f{i}" for i in range(len(FEATURE_SCHEMA))]))
+    assert not asyncio.run(service.load_model())
+    assert not asyncio.run(service.load_model())
+    assert len(service.s3_client.gets) == 1
+    assert 'do not match schema' in service.rejected_reason
+
+    # Un objeto nuevo (otro ETag) se vuelve a descargar
+    service.s3_client = StubS3(model_bytes(), etag='"v2"')
+    assert asyncio.run(service.load_model())
+    assert service.model_version == 'v2'
+
+
+def test_parallel_ranged_download_is_byte_exact(service, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_module, 'S3_MULTIPART_THRESHOLD', 64 * 1024)
+    monkeypatch.setattr(model_module, 'S3_PART_SIZE', 64 * 1024)
+    monkeypatch.setattr(model_module, 'S3_DOWNLOAD_CONCURRENCY', 4)
+    data = np.random.default_rng(1).bytes(64 * 1024 * 5 + 123)
+    service.s3_client = StubS3(data)
+    path = tmp_path / 'model.bin'
+    path.touch()
+
+    stats = service._download_model(str(path), service.s3_client.head_object())
+    assert path.read_bytes() == data
+    assert stats['parts'] == 6 and stats['bytes'] == len(data)
+    assert stats['mbPerSecond'] is None or stats['mbPerSecond'] > 0
+    assert sorted(service.s3_client.gets, key=lambda r: int(r[6:].split('-')[0]))[-1] == \
+        f"bytes={64 * 1024 * 5}-{len(data) - 1}"
+
+
+def test_parallel_ranged_load(service, monkeypatch):
+    monkeypatch.setattr(model_module, 'S3_MULTIPART_THRESHOLD', 2048)
+    monkeypatch.setattr(model_module, 'S3_PART_SIZE', 2048)
+    service.s3_client = StubS3(model_bytes())
+    assert asyncio.run(service.load_model())
+    assert service.download_stats['parts'] == len(service.s3_client.gets) > 1
+
+
+def test_if_match_mismatch_fails_the_load(service, monkeypatch):
+    monkeypatch.setattr(model_module, 'S3_MULTIPART_THRESHOLD', 2048)
+    monkeypatch.setattr(model_module, 'S3_PART_SIZE', 2048)
+    service.s3_client = ChangedS3(model_bytes())
+    assert not asyncio.run(service.load_model())
+    assert not service.model_loaded and service.model is None
+    # Un fallo de descarga no se recuerda como rechazo del esquema
+    assert service.rejected_version is None
+
+
+def test_sklearn_wrapper_is_loaded_as_booster(service):
+    import pandas as pd
+    import xgboost as xgb
+
+    rng = np.random.default_rng(0)
+    features = pd.DataFrame(rng.normal(size=(200, len(FEATURE_SCHEMA))), columns=list(FEATURE_SCHEMA.names))
+    classifier = xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(features, features['1'] > 0)
+    buffer = io.BytesIO()
+    joblib.dump(classifier, buffer)
+    service.s3_client = StubS3(buffer.getvalue())
+
+    assert asyncio.run(service.load_model())
+    assert isinstance(service.model, xgb.Booster)
+    predictions, confidences, contributions = run_model(service.model, features.to_numpy(np.float32)[:3])
+    assert predictions.shape == confidences.shape == (3,)
+    assert contributions.shape == (3, len(FEATURE_SCHEMA) + 1)
@@ -0,0 +1,206 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import numpy as np
+
+import news_service as news_module
+from news_service import NewsService, score_articles
+
+
+def article(article_id, title, description='', minutes_ago=10, insights=None):
+    published = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return {
+        'id': article_id,
+        'title': title,
+        'description': description,
+        'published_utc': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'article_url': f"https://example.com/{article_id}",
+        'publisher': {'name': 'Stub'},
+        'insights': insights or []
+    }
+
+
+class StubPolygon:
+    """In-process stand-in for the Polygon news endpoint"""
+
+    def __init__(self, pages, delay=0.0, fail=False):
+        self.pages = list(pages)
+        self.delay = delay
+        self.fail = fail
+        self.requests = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            return httpx.Response(500, json={'status': 'ERROR'})
+        page = self.pages.pop(0) if len(self.pages) > 1 else self.pages[0]
+        # Una página puede ser la respuesta completa (con next_url) o solo sus resultados
+        return httpx.Response(200, json=page if isinstance(page, dict) else {'results': page})
+
+    def service(self) -> NewsService:
+        return NewsService(base_url='http://polygon.stub', api_key='SECRET123', ticker='SPY',
+                           transport=httpx.MockTransport(self.handler))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_batch_scores():
+    articles = [
+        article('a', 'Stocks rally and surge'),
+        article('b', 'Shares plunge on recession fears'),
+        article('c', 'Markets open'),
+        article('d', 'Stocks plunge', insights=[{'ticker': 'SPY', 'sentiment': 'positive'}]),
+        article('e', 'Stocks plunge', insights=[{'ticker': 'QQQ', 'sentiment': 'positive'}]),
+    ]
+    scores = score_articles(articles, 'SPY')
+    np.testing.assert_allclose(scores, [1.0, (-1.0 - 1.0 - 0.8) / 3, 0.0, 1.0, -1.0])
+
+
+def test_articles_deduplicated_across_refreshes(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_REFRESH_INTERVAL', 0)
+    stub = StubPolygon([
+        [article('a', 'Stocks rally', minutes_ago=30), article('b', 'Stocks slump', minutes_ago=20)],
+        [article('b', 'Stocks slump', minutes_ago=20), article('c', 'Strong gains', minutes_ago=5)],
+    ])
+    service = stub.service()
+
+    async def scenario():
+        first = await service.get_sentiment(7, 10)
+        second = await service.get_sentiment(7, 10)
+        await service.close()
+        return first, second
+
+    first, second = run(scenario())
+    assert len(stub.requests) == 2
+    assert first['sentiment']['articlesAnalyzed'] == 2
+    assert second['sentiment']['articlesAnalyzed'] == 3
+    assert [a['id'] for a in second['articles']] == ['c', 'b', 'a']
+
+
+def test_single_upstream_call_per_interval_with_concurrent_callers(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_REFRESH_INTERVAL', 300)
+    stub = StubPolygon([[article('a', 'Stocks rally')]], delay=0.05)
+    service = stub.service()
+
+    async def scenario():
+        results = await asyncio.gather(*(service.get_sentiment(7, 10) for _ in range(20)))
+        results.append(await service.get_sentiment(3, 5))
+        await service.close()
+        return results
+
+    results = run(scenario())
+    assert len(stub.requests) == 1
+    assert all(r['sentiment']['articlesAnalyzed'] == 1 for r in results)
+
+
+def test_api_key_sent_in_header_not_url():
+    stub = StubPolygon([[article('a', 'Stocks rally')]])
+    service = stub.service()
+
+    async def scenario():
+        await service.get_sentiment(7, 10)
+        await service.close()
+
+    run(scenario())
+    request = stub.requests[0]
+    assert request.headers['Authorization'] == 'Bearer SECRET123'
+    assert 'SECRET123' not in str(request.url)
+
+
+def test_failed_refresh_is_reported(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_REFRESH_INTERVAL', 300)
+    monkeypatch.setattr(news_module, 'NEWS_RETRY_INTERVAL', 0)
+    stub = StubPolygon([[article('a', 'Stocks rally')]], fail=True)
+    service = stub.service()
+
+    async def scenario():
+        unavailable = await service.get_sentiment(7, 10)
+        stub.fail = False
+        service.last_refresh = None
+        fresh = await service.get_sentiment(7, 10)
+        stub.fail = True
+        service.last_refresh = None
+        stale = await service.get_sentiment(7, 10)
+        await service.close()
+        return unavailable, fresh, stale
+
+    unavailable, fresh, stale = run(scenario())
+    assert unavailable is None
+    assert fresh['stale'] is False and fresh['sentiment']['articlesAnalyzed'] == 1
+    assert stale['stale'] is True and stale['sentiment']['articlesAnalyzed'] == 1
+
+
+def test_retry_after_failure_uses_retry_interval(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_REFRESH_INTERVAL', 300)
+    monkeypatch.setattr(news_module, 'NEWS_RETRY_INTERVAL', 0)
+    stub = StubPolygon([[article('a', 'Stocks rally')]], fail=True)
+    service = stub.service()
+
+    async def scenario():
+        await service.get_sentiment(7, 10)
+        stub.fail = False
+        result = await service.get_sentiment(7, 10)
+        await service.close()
+        return result
+
+    result = run(scenario())
+    assert len(stub.requests) == 2
+    assert result['stale'] is False
+
+
+
+def test_backfill_follows_next_url(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_REFRESH_INTERVAL', 300)
+    stub = StubPolygon([
+        {'results': [article('c', 'Stocks rally', minutes_ago=10)], 'next_url': 'http://polygon.stub/v2/reference/news?cursor=p2'},
+        {'results': [article('b', 'Stocks slump', minutes_ago=3000)], 'next_url': 'http://polygon.stub/v2/reference/news?cursor=p3'},
+        {'results': [article('a', 'Strong gains', minutes_ago=9000)]},
+    ])
+    service = stub.service()
+
+    async def scenario():
+        result = await service.get_sentiment(7, 10)
+        await service.close()
+        return result
+
+    result = run(scenario())
+    assert len(stub.requests) == 3
+    assert stub.requests[1].url.params['cursor'] == 'p2'
+    assert stub.requests[2].headers['Authorization'] == 'Bearer SECRET123'
+    assert [a['id'] for a in result['articles']] == ['c', 'b', 'a']
+
+
+def test_backfill_page_cap(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_MAX_PAGES', 2)
+    endless = {'results': [article('a', 'Stocks rally')], 'next_url': 'http://polygon.stub/v2/reference/news?cursor=x'}
+    stub = StubPolygon([endless])
+    service = stub.service()
+
+    async def scenario():
+        result = await service.get_sentiment(7, 10)
+        await service.close()
+        return result
+
+    result = run(scenario())
+    assert len(stub.requests) == 2
+    assert result['sentiment']['articlesAnalyzed'] == 1
+
+
+def test_days_capped_at_lookback_window(monkeypatch):
+    monkeypatch.setattr(news_module, 'NEWS_LOOKBACK_DAYS', 7)
+    stub = StubPolygon([[article('a', 'Stocks rally')]])
+    service = stub.service()
+
+    async def scenario():
+        result = await service.get_sentiment(30, 10)
+        await service.close()
+        return result
+
+    result = run(scenario())
+    assert result['days'] == 7
+    assert list(service.aggregates) == [(7, 10)]
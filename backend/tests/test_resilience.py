@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError
+
+
+def failing():
+    raise ConnectionError("upstream down")
+
+
+def test_cancelled_trial_call_releases_half_open_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+    release = threading.Event()
+
+    def blocking():
+        release.wait(5)
+        return 'late'
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        assert breaker.state == CircuitBreaker.OPEN
+        await asyncio.sleep(0.06)
+
+        trial = asyncio.create_task(breaker.call(blocking))
+        await asyncio.sleep(0.02)
+        assert breaker.trial_in_flight
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(lambda: 'rejected')
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        release.set()
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.trial_in_flight
+        assert await breaker.call(lambda: 'ok') == 'ok'
+
+    asyncio.run(scenario())
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_trial_failure_reopens_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        time.sleep(0.06)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(lambda: 'rejected')
+
+    asyncio.run(scenario())
+    assert breaker.counters['opened'] == 2
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+from concurrent.futures import BrokenExecutor
+
+import pytest
+
+from workers import PoolSaturated, StagePool
+
+
+def _square(x):
+    return x * x
+
+
+def _die(code):
+    os._exit(code)
+
+
+@pytest.fixture
+def process_pool():
+    pool = StagePool('test', 'process', max_workers=1, max_queue=4)
+    yield pool
+    pool.shutdown()
+
+
+def test_broken_process_pool_is_recreated(process_pool):
+    async def scenario():
+        assert await process_pool.run(_square, 3) == 9
+        # El worker muere en cada intento: tras el reintento la llamada falla
+        with pytest.raises(BrokenExecutor):
+            await process_pool.run(_die, 1)
+        # El executor roto se descartó: las llamadas siguientes funcionan
+        return await process_pool.run(_square, 4)
+
+    assert asyncio.run(scenario()) == 16
+    stats = process_pool.stats()
+    assert stats['restarts'] == 2
+    assert stats['failed'] == 1
+    assert stats['completed'] == 2
+
+
+def test_saturated_pool_rejects():
+    pool = StagePool('test', 'thread', max_workers=1, max_queue=0)
+
+    async def scenario():
+        slow = asyncio.create_task(pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolSaturated):
+            await pool.run(_square, 2)
+        await slow
+
+    asyncio.run(scenario())
+    pool.shutdown()
+    assert pool.stats()['rejected'] == 1
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from config import (INDICATOR_POOL_KIND, INDICATOR_POOL_QUEUE, INDICATOR_POOL_WORKERS,
+                    POOL_RETRY_AFTER, PREDICT_POOL_KIND, PREDICT_POOL_QUEUE, PREDICT_POOL_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """Raised when a stage's admission queue is full; maps to 503 + Retry-After"""
+
+    def __init__(self, stage: str, retry_after: float):
+        super().__init__(f"Stage '{stage}' is saturated")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+# Se ejecuta en el worker: devuelve también cuándo empezó (para medir la espera en cola)
+def _timed_call(func: Callable, args: tuple):
+    started = time.time()
+    return started, func(*args)
+
+
+class StagePool:
+    """Worker pool for one CPU-bound stage with bounded admission.
+
+    At most ``max_workers`` calls run and ``max_queue`` wait; any call beyond
+    that is rejected immediately with ``PoolSaturated`` instead of queueing
+    without bound. ``kind`` is ``'process'`` for pure-Python/pandas work that
+    holds the GIL, or ``'thread'`` for native code that releases it.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int,
+                 retry_after: float = POOL_RETRY_AFTER):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"Unknown pool kind for stage '{name}': {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self.retry_after = retry_after
+        self.executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'restarts': 0}
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _executor(self) -> Executor:
+        if self.executor is None:
+            if self.kind == 'process':
+                self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"{self.name}-worker")
+        return self.executor
+
+    # Ejecuta una función en el pool o rechaza si la cola está llena
+    async def run(self, func: Callable, *args):
+        """Run ``func(*args)`` on the stage's workers, rejecting when saturated"""
+        if self.in_flight >= self.capacity:
+            self.counters['rejected'] += 1
+            raise PoolSaturated(self.name, self.retry_after)
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.counters['submitted'] += 1
+        submitted = time.time()
+        try:
+            try:
+                executor = self._executor()
+                started, result = await asyncio.get_running_loop().run_in_executor(
+                    executor, _timed_call, func, args
+                )
+            except BrokenExecutor:
+                # Un worker murió (p. ej. OOM): se recrea el executor y se reintenta una vez
+                self._restart(executor)
+                executor = self._executor()
+                started, result = await asyncio.get_running_loop().run_in_executor(
+                    executor, _timed_call, func, args
+                )
+        except BrokenExecutor:
+            self.counters['failed'] += 1
+            self._restart(executor)
+            raise
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        finished = time.time()
+        self.counters['completed'] += 1
+        self.total_wait += max(0.0, started - submitted)
+        self.total_run += finished - started
+        return result
+
+    def _restart(self, broken: Executor):
+        # Varias llamadas pueden fallar a la vez con el mismo executor roto: se descarta una sola vez
+        if self.executor is broken:
+            logger.error(f"Stage '{self.name}' worker pool is broken, recreating it")
+            self.executor = None
+            self.counters['restarts'] += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        completed = self.counters['completed']
+        return {
+            'kind': self.kind,
+            'workers': self.max_workers,
+            'capacity': self.capacity,
+            'inFlight': self.in_flight,
+            'peakInFlight': self.peak_in_flight,
+            'utilization': round(self.in_flight / self.capacity, 3),
+            'avgQueueWait': round(self.total_wait / completed, 4) if completed else 0.0,
+            'avgRunTime': round(self.total_run / completed, 4) if completed else 0.0,
+            **self.counters
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Pools globales por etapa
+indicator_pool = StagePool('indicators', INDICATOR_POOL_KIND, INDICATOR_POOL_WORKERS, INDICATOR_POOL_QUEUE)
+predict_pool = StagePool('predict', PREDICT_POOL_KIND, PREDICT_POOL_WORKERS, PREDICT_POOL_QUEUE)
+
+
+def pool_stats() -> Dict:
+    return {pool.name: pool.stats() for pool in (indicator_pool, predict_pool)}
+
+
+def shutdown_pools():
+    for pool in (indicator_pool, predict_pool):
+        pool.shutdown()
@@ -9,9 +9,6 @@ import { MarketDataService } from './services/MarketDataService';
 import type { SP500Prediction, SentimentData, NewsArticle, MarketData } from './types';
 import { RefreshCw } from 'lucide-react';
 
-// Configuration - In a real app, these would come from environment variables
-const POLYGON_API_KEY = 'CQYzwNSbF_8jNZd2cXAa6CG_AsUNylwa';
-
 function App() {
   const [prediction, setPrediction] = useState<SP500Prediction | null>(null);
   const [sentimentData, setSentimentData] = useState<SentimentData | null>(null);
@@ -28,7 +25,7 @@ function App() {
   const [error, setError] = useState<string | null>(null);
 
   // Initialize services
-  const sentimentService = new SentimentAnalysisService(POLYGON_API_KEY);
+  const sentimentService = new SentimentAnalysisService();
   const modelService = new ModelInferenceService();
   const marketService = new MarketDataService();
 
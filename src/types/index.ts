@@ -44,11 +44,8 @@ export interface SP500Prediction {
   probability: number;
   targetPrice: number;
   timeframe: string;
-  factors: {
-    technical: number;
-    sentiment: number;
-    momentum: number;
-  };
+  factors: Record<string, number>; // Relative SHAP weight per factor group
+  factorContributions?: Record<string, number>; // Signed SHAP contribution per group, plus bias
   technicalIndicators: TechnicalIndicators; // Added for component compatibility
   lastUpdated: Date;
 }